@@ -0,0 +1,215 @@
+#!/usr/bin/env python3
+"""
+afe.py
+L(1/2, f x chi3) and L'(1/2, f x chi3) from the approximate functional
+equation, for a level one Maass form f with spectral parameter R.
+
+The twist has conductor 9 and completed L-function
+
+  Lambda(s) = 9^{s/2} Gamma_R(s+delta+iR) Gamma_R(s+delta-iR) L(s),
+  Gamma_R(s) = pi^{-s/2} Gamma(s/2),   Lambda(s) = eps * Lambda(1-s),
+
+where delta = 0 for odd f and 1 for even f (chi3 is odd, so twisting flips
+the parity), and eps = -1 for odd f, +1 for even f
+(drafts/root_number_derivation.md). Moving the line of integration in
+(1/2 pi i) int Lambda(1/2+u) G(u) du/u^k, G even with G(0) = 1, gives
+
+  eps = +1:  L(1/2)  = 2 sum_n a_n chi3(n) n^{-1/2} W_1(n/3)
+             L'(1/2) = -(gamma'/gamma)(1/2) L(1/2)
+  eps = -1:  L(1/2)  = 0
+             L'(1/2) = 2 sum_n a_n chi3(n) n^{-1/2} W_2(n/3)
+
+with W_k(y) = (1/2 pi i) int_{(c)} gamma(1/2+u)/gamma(1/2) G(u) y^{-u} du/u^k.
+W_k(n/3) decays exponentially once n is past about sqrt(9)*R/(2 pi): at
+R ~ 32 some 25 coefficients give L'(1/2) to 1e-8, where the exp(-n/2000)
+smoothed series needs thousands. W_k is computed once per form by the trapezoid rule in t
+on u = c + it (exponentially accurate for this analytic integrand), with the
+gamma ratio from mpmath.loggamma.
+
+The sum is cut at the smallest N for which the Kim-Sarnak bound
+|a_n| <= d(n) n^{7/64} (coeff_bounds.py) puts the rest of the series below
+--tol; the number of coefficients used and the tail bound are reported.
+Results for two different test functions G must agree; --check prints the
+difference, a test of the functional equation and of the coefficients.
+
+Usage (run from code/):
+  python3 afe.py --posts outputs/scan_postprocess --tol 1e-8
+"""
+import os
+import csv
+import math
+import argparse
+
+import numpy as np
+import mpmath
+
+import compute_L_derivative as cld
+import coeff_bounds
+import dirichlet_series as ds
+
+CONDUCTOR = 9
+FIELDS = ['R', 'Y', 'M', 'eps', 'L0', 'Lprime', 'N_used', 'tail_bound', 'converged', 'file']
+
+
+def root_number(symmetry):
+    """eps(f x chi3): -1 for odd forms (symmetry -1), +1 for even forms."""
+    return -1 if symmetry == -1 else 1
+
+
+class AFE(object):
+    """
+    Cutoff functions of the approximate functional equation for one form.
+
+    symmetry is the solver's symmetry type (-1 odd, +1 even); eps overrides
+    the root number. G(u) = exp(u^2/A) if A is given, else G = 1. c is the
+    abscissa of the contour and h the trapezoid step in t.
+    """
+
+    def __init__(self, R, symmetry=-1, eps=None, A=None, c=1.0, h=0.1, q=CONDUCTOR):
+        self.R = float(R)
+        self.eps = root_number(symmetry) if eps is None else int(eps)
+        self.delta = 0 if symmetry == -1 else 1
+        self.A = A
+        self.c = c
+        self.h = h
+        self.q = q
+        self._nodes = {}
+
+    def _log_gamma_ratio(self, u):
+        # log of gamma(1/2+u)/gamma(1/2) without the q^{u/2} factor, plus log G(u)
+        out = -u*mpmath.log(mpmath.pi)
+        for sgn in (1, -1):
+            z = 0.5 + self.delta + sgn*1j*self.R
+            out += mpmath.loggamma((z + u)/2) - mpmath.loggamma(z/2)
+        if self.A is not None:
+            out += u*u/self.A
+        return out
+
+    def nodes(self, k):
+        """
+        (u_j, trapezoid weights times the integrand without y^{-u}) for W_k,
+        on t_j = j*h, j >= 0, up to where the integrand is negligible.
+        """
+        if k in self._nodes:
+            return self._nodes[k]
+        us, ws = [], []
+        peak = 0.0
+        j = 0
+        while True:
+            u = mpmath.mpc(self.c, j*self.h)
+            w = complex(mpmath.exp(self._log_gamma_ratio(u)) / u**k)
+            w *= 0.5 if j == 0 else 1.0
+            us.append(complex(u))
+            ws.append(w)
+            peak = max(peak, abs(w))
+            j += 1
+            if j*self.h > self.R + 10 and abs(w) < 1e-20*peak:
+                break
+        self._nodes[k] = (np.array(us), np.array(ws) * self.h/math.pi)
+        return self._nodes[k]
+
+    def W(self, y, k):
+        """W_k at each y in `y` (the integrand is conjugate-symmetric in t, so W is real)."""
+        us, ws = self.nodes(k)
+        logy = np.log(np.asarray(y, dtype=np.float64))
+        return (np.exp(-np.outer(logy, us)) @ ws).real
+
+    def log_derivative(self):
+        """(gamma'/gamma)(1/2)."""
+        out = 0.5*math.log(self.q) - math.log(math.pi)
+        for sgn in (1, -1):
+            out += 0.5*float(mpmath.re(mpmath.digamma((0.5 + self.delta + sgn*1j*self.R)/2)))
+        return out
+
+    def central_values(self, a, tol=1e-8, n_max=None):
+        """
+        L(1/2), L'(1/2) from the coefficients a[0]=a1 and how many were used.
+
+        Returns a dict with L0, Lprime, N_used, tail_bound (bound on the
+        neglected part of the series, including n beyond len(a)) and
+        converged (tail_bound <= tol).
+        """
+        k = 2 if self.eps == -1 else 1
+        M = len(a)
+        # W_k is only evaluated up to where the bounded terms have decayed
+        # (past the data too), so the cost does not depend on len(a)
+        N = max(64, int(2*math.sqrt(self.q)*(1.0 + self.R)))
+        while True:
+            n = np.arange(1, N+1, dtype=np.float64)
+            Wn = self.W(n/math.sqrt(self.q), k)
+            bound = 2*coeff_bounds.coeff_bound(N) * n**-0.5 * np.abs(Wn)
+            if bound[-1] < 1e-3*tol*(1.0/N) or N >= 1000000:
+                break
+            N *= 2
+        if n_max is not None:
+            M = min(M, n_max)
+        M = min(M, N)
+        # tail[i] = bound on sum_{n > i}
+        tail = np.concatenate((np.cumsum(bound[::-1])[::-1], [0.0]))
+        N_used = int(np.argmax(tail[:M+1] <= tol)) if np.any(tail[:M+1] <= tol) else M
+        idx, nn, logn, chi = ds.series_tables(N_used)
+        term = 2*np.asarray(a[:N_used], dtype=np.float64)[idx] * chi * nn**-0.5 * Wn[idx]
+        S = float(term.sum())
+        if self.eps == -1:
+            L0, Lp = 0.0, S
+        else:
+            L0, Lp = S, -self.log_derivative()*S
+        return {'L0': L0, 'Lprime': Lp, 'N_used': N_used, 'tail_bound': float(tail[N_used]),
+                'converged': bool(tail[N_used] <= tol), 'eps': self.eps}
+
+
+def process_posts_dir(posts_dir, symmetry=-1, eps=None, tol=1e-8, A=None, files=None):
+    """
+    (R, Y, M, result dict, path) for every coefficient dump under posts_dir.
+    The cutoff functions depend only on R, so dumps of one form at several
+    Y share them. `files` (R, Y, path) tuples replace the directory walk.
+    """
+    results = []
+    forms = {}
+    for R, Y, path in (cld.iter_coeff_files(posts_dir) if files is None else files):
+        a = cld.read_coeff_file(path)
+        if not len(a):
+            continue
+        if R not in forms:
+            forms[R] = AFE(R, symmetry, eps=eps, A=A)
+        results.append((R, Y, len(a), forms[R].central_values(a, tol=tol), path))
+    return results
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--posts', default='outputs/scan_postprocess', help='postprocess outputs dir')
+    p.add_argument('--symmetry', type=int, default=-1, help='-1 odd forms, +1 even forms')
+    p.add_argument('--eps', type=int, default=None, help='override the root number (+1 or -1)')
+    p.add_argument('--tol', type=float, default=1e-8, help='absolute tolerance for the truncated series')
+    p.add_argument('--check', action='store_true', help='also evaluate with G(u)=exp(u^2/4) and print the difference')
+    p.add_argument('--out', default=None, help='output CSV (default: <posts>/L_afe.csv)')
+    args = p.parse_args()
+
+    rows = []
+    res_all = process_posts_dir(args.posts, args.symmetry, eps=args.eps, tol=args.tol)
+    if args.check:
+        alts = process_posts_dir(args.posts, args.symmetry, eps=args.eps, tol=args.tol, A=4.0)
+    for k, (R, Y, M, res, path) in enumerate(res_all):
+        line = (f"R={R:.12f} Y={Y:.3f} M={M} eps={res['eps']:+d} L(1/2)={res['L0']:+.10e} "
+                f"L'(1/2)={res['Lprime']:+.10e} N_used={res['N_used']} tail<={res['tail_bound']:.1e}")
+        if not res['converged']:
+            line += ' NOT CONVERGED'
+        if args.check:
+            alt = alts[k][3]
+            line += f" check={abs(alt['Lprime'] - res['Lprime']) + abs(alt['L0'] - res['L0']):.1e}"
+        print(line)
+        rows.append({'R': f'{R:.12f}', 'Y': f'{Y:.3f}', 'M': M, 'eps': res['eps'],
+                     'L0': f"{res['L0']:.12e}", 'Lprime': f"{res['Lprime']:.12e}",
+                     'N_used': res['N_used'], 'tail_bound': f"{res['tail_bound']:.3e}",
+                     'converged': int(res['converged']), 'file': path})
+    outcsv = args.out or os.path.join(args.posts, 'L_afe.csv')
+    with open(outcsv, 'w', newline='') as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        w.writerows(rows)
+    print('Wrote', outcsv)
+
+
+if __name__ == '__main__':
+    main()
@@ -7,24 +7,53 @@ Writes:
  - outputs/scan_postprocess/plots/stability_hist.png
  - outputs/scan_postprocess/plots/stability_vs_R.png
 
+Bootstrap replicates are drawn from a generator seeded by --seed and the
+group (file name or R), so reruns give identical intervals. Replicates are
+generated in chunks that fit in --max-mem-mb, and --jobs spreads the per-file
+and per-R groups over a process pool.
+
+With --exact no resampling is done: the 2.5/97.5 percentiles come from the
+closed-form bootstrap distribution of the sample median (binomial
+probabilities over the sorted sample, see ExactMedianBootstrap), and --boot,
+--seed and --max-mem-mb are ignored.
+
+With --stream the stability files are loaded column-wise in chunks and each
+file and R group only keeps a count, the number of positive values and a
+mergeable QuantileSketch, so memory does not grow with the number of rows.
+Medians and intervals then come from the exact weighted bootstrap over the
+sketch; groups with at most --sketch-size values give the same result as
+--exact.
+
 Usage:
   python3 aggregate_stability.py --posts outputs/scan_postprocess --boot 2000
+  python3 aggregate_stability.py --posts outputs/scan_postprocess --boot 100000 --jobs 8 --seed 1
+
+Plots are written with matplotlib, imported only at that point; --no-plots
+skips them.
 """
+import startup_report
+startup_report.install_from_argv()
+
 import os
 import glob
 import csv
 import argparse
 import math
+import json
+import zlib
+import bisect
+import hashlib
 from statistics import median
+from concurrent.futures import ProcessPoolExecutor
 
 try:
     import numpy as np
-    import matplotlib
-    matplotlib.use('Agg')
-    import matplotlib.pyplot as plt
-except Exception:
+except ImportError:
     np = None
-    plt = None
+
+
+STATE_NAME = 'stability_state.json'
+STATE_VERSION = 1
 
 
 def ensure_dir(d):
@@ -50,39 +79,485 @@ def read_stab_file(path):
     return rows
 
 
-def bootstrap_median(samples, reps=2000):
+def _betacf(a, b, x):
+    # continued fraction for the incomplete beta function (modified Lentz)
+    tiny = 1e-300
+    qab, qap, qam = a + b, a + 1.0, a - 1.0
+    c = 1.0
+    d = 1.0 - qab*x/qap
+    d = 1.0/(d if abs(d) > tiny else tiny)
+    h = d
+    for k in range(1, 10000):
+        k2 = 2*k
+        aa = k*(b - k)*x/((qam + k2)*(a + k2))
+        d = 1.0 + aa*d
+        d = 1.0/(d if abs(d) > tiny else tiny)
+        c = 1.0 + aa/c
+        c = c if abs(c) > tiny else tiny
+        h *= d*c
+        aa = -(a + k)*(qab + k)*x/((a + k2)*(qap + k2))
+        d = 1.0 + aa*d
+        d = 1.0/(d if abs(d) > tiny else tiny)
+        c = 1.0 + aa/c
+        c = c if abs(c) > tiny else tiny
+        delta = d*c
+        h *= delta
+        if abs(delta - 1.0) < 1e-15:
+            break
+    return h
+
+
+def binom_tail(n, m, p):
+    """P(Binomial(n, p) >= m), via the regularized incomplete beta I_p(m, n-m+1)."""
+    if m <= 0 or p >= 1.0:
+        return 1.0
+    if m > n or p <= 0.0:
+        return 0.0
+    a, b = float(m), float(n - m + 1)
+    lbt = math.lgamma(a + b) - math.lgamma(a) - math.lgamma(b) + a*math.log(p) + b*math.log1p(-p)
+    if p < (a + 1.0)/(a + b + 2.0):
+        return math.exp(lbt)*_betacf(a, b, p)/a
+    return 1.0 - math.exp(lbt)*_betacf(b, a, 1.0 - p)/b
+
+
+class ExactMedianBootstrap(object):
+    """
+    Exact bootstrap distribution of the median of n draws from the discrete
+    distribution putting weight w_i on the value v_i (the empirical
+    distribution of the sample when all weights are equal).
+
+    With P_i the cumulative weight of v_1 < ... < v_k:
+      n = 2m-1:  P(med* <= v_i) = P(Binom(n, P_i) >= m)
+      n = 2m:    med* = (X*_(m) + X*_(m+1))/2 and, for i < j,
+                 P(X*_(m) = v_i, X*_(m+1) = v_j) = C(n,m) A_i B_j with
+                 A_i = P_i^m - P_{i-1}^m, B_j = (1-P_{j-1})^(n-m) - (1-P_j)^(n-m);
+                 the i = j mass is P(X*_(m) = v_i) minus the i < j pairs.
+    The B_j telescope, so P(med* <= t) needs only the last j paired with
+    each i, found in one sweep comparing v_i + v_j <= 2t (no subtraction, so
+    an attained midpoint t keeps its own pair); quantiles are found by
+    bisection on t and snapped to the attained value.
+    """
+
+    def __init__(self, values, weights=None, n=None):
+        if weights is None:
+            weights = [1.0]*len(values)
+        pairs = sorted((float(v), float(w)) for v, w in zip(values, weights) if w > 0)
+        self.v = []
+        w = []
+        for v, wi in pairs:
+            if self.v and v == self.v[-1]:
+                w[-1] += wi
+            else:
+                self.v.append(v)
+                w.append(wi)
+        if not self.v:
+            raise ValueError('no samples')
+        total = sum(w)
+        self.P = []
+        acc = 0.0
+        for wi in w:
+            acc += wi
+            self.P.append(min(1.0, acc/total))
+        self.P[-1] = 1.0
+        self.n = int(n) if n is not None else len(values)
+        self.m = (self.n + 1)//2
+        self.tail = [binom_tail(self.n, self.m, Pi) for Pi in self.P]
+        if self.n % 2 == 0:
+            self.lC = math.lgamma(self.n + 1) - 2*math.lgamma(self.m + 1)
+
+    def _g(self, p, q):
+        # C(n,m) p^m (1-q)^(n-m); n = 2m >= 2, so both powers vanish at the ends
+        if p <= 0.0 or q >= 1.0:
+            return 0.0
+        return math.exp(self.lC + self.m*math.log(p) + (self.n - self.m)*math.log1p(-q))
+
+    def _last_pairs(self, t):
+        # (i, J) with J the largest index such that v_i + v_J <= 2t, for the
+        # i with J >= i; J only decreases as i grows
+        v = self.v
+        t2 = 2.0*t
+        J = len(v) - 1
+        for i in range(len(v)):
+            while J >= i and v[i] + v[J] > t2:
+                J -= 1
+            if J < i:
+                return
+            yield i, J
+
+    def cdf(self, t):
+        """P(med* <= t)."""
+        v, P = self.v, self.P
+        if self.n % 2:
+            i = bisect.bisect_right(v, t) - 1
+            return self.tail[i] if i >= 0 else 0.0
+        total = 0.0
+        for i, J in self._last_pairs(t):
+            Pm = P[i-1] if i else 0.0
+            Tm = self.tail[i-1] if i else 0.0
+            # P(X*_(m) = v_i) less the pairs (i, j) with j > J
+            total += self.tail[i] - Tm - (self._g(P[i], P[J]) - self._g(Pm, P[J]))
+        return min(1.0, max(0.0, total))
+
+    def quantile(self, q):
+        """Smallest attained value u of med* with P(med* <= u) >= q."""
+        v = self.v
+        if self.n % 2:
+            for vi, Ti in zip(v, self.tail):
+                if Ti >= q:
+                    return vi
+            return v[-1]
+        lo, hi = v[0], v[-1]
+        if self.cdf(lo) >= q:
+            return lo
+        for _ in range(200):
+            mid = 0.5*(lo + hi)
+            if mid <= lo or mid >= hi:
+                break
+            if self.cdf(mid) >= q:
+                hi = mid
+            else:
+                lo = mid
+        # the attained midpoint in (lo, hi]
+        best = None
+        for i, J in self._last_pairs(hi):
+            u = 0.5*(v[i] + v[J])
+            if best is None or u > best:
+                best = u
+        return best
+
+
+def group_rng(seed, key):
+    """
+    Generator for one bootstrap group. It is seeded from the run seed and the
+    group key alone, so a group gets the same replicates whatever other
+    groups are processed and in whichever worker it runs.
+    """
+    sub = zlib.crc32(str(key).encode())
     if np is None:
-        # simple non-numpy bootstrap
         import random
+        return random.Random(seed * 2**32 + sub)
+    return np.random.default_rng([seed, sub])
+
+
+def exact_median_ci(samples, weights=None, n=None, alpha=0.05):
+    """(lo, hi) percentiles of the exact bootstrap distribution of the median."""
+    E = ExactMedianBootstrap(samples, weights, n)
+    return E.quantile(alpha/2), E.quantile(1 - alpha/2)
+
+
+def bootstrap_median(samples, reps=2000, rng=None, max_mem_mb=256, exact=False):
+    if exact:
+        if len(samples) == 0:
+            return (None,None,None)
+        lo, hi = exact_median_ci(samples)
+        return (median(samples), lo, hi)
+    if rng is None:
+        rng = group_rng(0, '')
+    if np is None:
+        # simple non-numpy bootstrap
         n = len(samples)
         if n == 0:
             return (None,None,None)
         meds = []
         for _ in range(reps):
-            s = [random.choice(samples) for _ in range(n)]
+            s = [rng.choice(samples) for _ in range(n)]
             meds.append(median(s))
         meds.sort()
         lo = meds[int(0.025*reps)]
         hi = meds[int(0.975*reps)]
         return (median(samples), lo, hi)
     else:
-        arr = np.array(samples)
+        arr = np.asarray(samples, dtype=np.float64)
         if arr.size == 0:
             return (None,None,None)
         n = arr.size
-        idx = np.random.randint(0, n, size=(reps, n))
-        # compute median across axis=1 for each bootstrap sample
-        res = np.median(arr[idx], axis=1)
+        # replicates per chunk: an index array, the gathered copy and the
+        # median's working copy, 8 bytes per entry each
+        chunk = max(1, min(reps, int(max_mem_mb * 2**20 // (24 * n))))
+        res = np.empty(reps)
+        for i in range(0, reps, chunk):
+            k = min(chunk, reps - i)
+            idx = rng.integers(0, n, size=(k, n))
+            res[i:i+k] = np.median(arr[idx], axis=1)
         lo = np.percentile(res, 2.5)
         hi = np.percentile(res, 97.5)
         return (float(np.median(arr)), float(lo), float(hi))
 
 
+def _bootstrap_task(key, samples, reps, seed, max_mem_mb, exact):
+    return bootstrap_median(samples, reps=reps, rng=group_rng(seed, key), max_mem_mb=max_mem_mb, exact=exact)
+
+
+def bootstrap_groups(groups, reps=2000, seed=0, max_mem_mb=256, jobs=1, exact=False):
+    """
+    (median, lo, hi) for each (key, samples) in `groups`, in order. With
+    jobs > 1 the groups are spread over a process pool; the results do not
+    depend on jobs.
+    """
+    args = [(key, samples, reps, seed, max_mem_mb, exact) for key, samples in groups]
+    if jobs <= 1 or len(args) <= 1:
+        return [_bootstrap_task(*a) for a in args]
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        return list(pool.map(_bootstrap_task, *zip(*args)))
+
+
+class QuantileSketch(object):
+    """
+    Mergeable weighted sample for medians of very large groups.
+
+    Values are kept exactly until there are more than `size` of them; then the
+    sorted values are compacted into `size` centroids of (close to) equal
+    weight, each at the weighted mean of the values it absorbs. Merging two
+    sketches concatenates them and compacts again, so memory stays O(size)
+    whatever the number of rows. `n` is the number of raw observations.
+    """
+
+    def __init__(self, size=2000):
+        self.size = size
+        self.values = np.zeros(0)
+        self.weights = np.zeros(0)
+        self.n = 0
+        self.compacted = False
+
+    def add(self, values):
+        values = np.asarray(values, dtype=np.float64).ravel()
+        self.values = np.concatenate((self.values, values))
+        self.weights = np.concatenate((self.weights, np.ones(values.size)))
+        self.n += values.size
+        if self.values.size > 2*self.size:
+            self.compact()
+
+    def merge(self, other):
+        self.values = np.concatenate((self.values, other.values))
+        self.weights = np.concatenate((self.weights, other.weights))
+        self.n += other.n
+        self.compacted = self.compacted or other.compacted
+        if self.values.size > 2*self.size:
+            self.compact()
+
+    def compact(self):
+        if self.values.size <= self.size:
+            return
+        order = np.argsort(self.values, kind='stable')
+        v = self.values[order]
+        w = self.weights[order]
+        cw = np.cumsum(w)
+        bucket = np.minimum((self.size*(cw - 0.5*w)/cw[-1]).astype(np.int64), self.size - 1)
+        wsum = np.bincount(bucket, weights=w, minlength=self.size)
+        vsum = np.bincount(bucket, weights=v*w, minlength=self.size)
+        keep = wsum > 0
+        self.values = vsum[keep]/wsum[keep]
+        self.weights = wsum[keep]
+        self.compacted = True
+
+    def median(self):
+        if not self.compacted:
+            return float(np.median(self.values))
+        order = np.argsort(self.values)
+        cw = np.cumsum(self.weights[order])
+        return float(self.values[order][np.searchsorted(cw, 0.5*cw[-1])])
+
+    def median_ci(self, alpha=0.05):
+        """(median, lo, hi) with the exact weighted bootstrap over the sketch."""
+        if self.n == 0:
+            return (None, None, None)
+        lo, hi = exact_median_ci(self.values, self.weights, n=self.n, alpha=alpha)
+        return (self.median(), lo, hi)
+
+
+def iter_stab_columns(path, chunk=100000):
+    """
+    Yield (R, Y, Lprime) float arrays from a stability CSV, `chunk` lines at a
+    time. Lines that do not parse are skipped, as in read_stab_file.
+    """
+    with open(path, 'r') as f:
+        header = f.readline().strip().split(',')
+        try:
+            cols = [header.index(c) for c in ('R', 'Y', 'Lprime')]
+        except ValueError:
+            return
+        while True:
+            lines = [line for _, line in zip(range(chunk), f)]
+            if not lines:
+                return
+            try:
+                block = np.loadtxt(lines, delimiter=',', usecols=cols, ndmin=2)
+            except ValueError:
+                good = []
+                for line in lines:
+                    parts = line.strip().split(',')
+                    try:
+                        good.append([float(parts[c]) for c in cols])
+                    except (ValueError, IndexError):
+                        continue
+                block = np.array(good).reshape(-1, 3)
+            if block.size:
+                yield block[:, 0], block[:, 1], block[:, 2]
+
+
+def _sketch_file(path, sketch_size):
+    """(R, Y, sketch, npos) for one stability file, or None if it has no rows."""
+    sk = QuantileSketch(sketch_size)
+    R = Y = None
+    npos = 0
+    for Rs, Ys, lps in iter_stab_columns(path):
+        if R is None:
+            R, Y = float(Rs[0]), float(Ys[0])
+        npos += int(np.count_nonzero(lps > 0))
+        sk.add(lps)
+    if sk.n == 0:
+        return None
+    return R, Y, sk, npos
+
+
+def _stream_file(path, sketch_size):
+    """(_sketch_file result, median CI) for one file."""
+    res = _sketch_file(path, sketch_size)
+    return res, (res[2].median_ci() if res is not None else None)
+
+
+def _sample_file(path):
+    """(R, Y, L' values, npos) for one stability file, or None if it has no rows."""
+    rows = read_stab_file(path)
+    if not rows:
+        return None
+    lps = [r['Lprime'] for r in rows]
+    # take R and Y from first row (all rows same file)
+    return rows[0]['R'], rows[0]['Y'], lps, sum(1 for v in lps if v > 0)
+
+
+class Aggregator(object):
+    """
+    Per-file and per-R summary rows for chosen files and R groups, reading
+    each stability file at most once per run. With stream=True files are
+    loaded in column chunks into QuantileSketches (see QuantileSketch);
+    otherwise all L' values are kept and bootstrapped with bootstrap_groups.
+    """
+
+    def __init__(self, boot, stream=False, sketch_size=2000):
+        self.boot = boot
+        self.stream = stream
+        self.sketch_size = sketch_size
+        self.loaded = {}
+
+    def _load(self, path):
+        if path not in self.loaded:
+            if self.stream:
+                self.loaded[path] = _sketch_file(path, self.sketch_size)
+            else:
+                self.loaded[path] = _sample_file(path)
+        return self.loaded[path]
+
+    def file_rows(self, paths):
+        """{file name: summary row, or None for a file without rows}."""
+        out = {}
+        jobs = self.boot.get('jobs', 1)
+        if self.stream and jobs > 1 and len(paths) > 1:
+            with ProcessPoolExecutor(max_workers=jobs) as pool:
+                results = list(pool.map(_stream_file, paths, [self.sketch_size]*len(paths)))
+        elif self.stream:
+            results = [_stream_file(fp, self.sketch_size) for fp in paths]
+        else:
+            results = [(self._load(fp), None) for fp in paths]
+        groups = []
+        for fp, (res, ci) in zip(paths, results):
+            name = os.path.basename(fp)
+            self.loaded[fp] = res
+            if res is None:
+                out[name] = None
+                continue
+            R, Y, data, npos = res
+            n = data.n if self.stream else len(data)
+            out[name] = {'file':name,'R':R,'Y':Y,'n':n,'frac_pos':npos/n}
+            if self.stream:
+                med, lo, hi = ci
+                out[name].update(median=med, lo=lo, hi=hi)
+            else:
+                groups.append((name, data))
+        if groups:
+            for (name, _), (med, lo, hi) in zip(groups, bootstrap_groups(groups, **self.boot)):
+                out[name].update(median=med, lo=lo, hi=hi)
+        return out
+
+    def R_rows(self, R_files):
+        """{R: summary row} pooling the files listed (in order) for each R in `R_files`."""
+        out = {}
+        groups = []
+        for R, paths in sorted(R_files.items()):
+            loaded = [res for res in (self._load(fp) for fp in paths) if res is not None]
+            if not loaded:
+                continue
+            npos = sum(res[3] for res in loaded)
+            if self.stream:
+                sk = QuantileSketch(self.sketch_size)
+                for res in loaded:
+                    sk.merge(res[2])
+                med, lo, hi = sk.median_ci()
+                out[R] = {'R':R,'n':sk.n,'median':med,'lo':lo,'hi':hi,'frac_pos':npos/sk.n}
+            else:
+                samples = [v for res in loaded for v in res[2]]
+                out[R] = {'R':R,'n':len(samples),'frac_pos':npos/len(samples)}
+                groups.append(('R=%r' % R, samples))
+        if groups:
+            Rs = [R for R in sorted(out) if 'median' not in out[R]]
+            for R, (med, lo, hi) in zip(Rs, bootstrap_groups(groups, **self.boot)):
+                out[R].update(median=med, lo=lo, hi=hi)
+        return out
+
+
+def file_fingerprint(path, old=None):
+    """size, mtime_ns and sha256 of `path`; the hash is reused from `old` if size and mtime match."""
+    st = os.stat(path)
+    fp = {'size': st.st_size, 'mtime_ns': st.st_mtime_ns}
+    if old is not None and old.get('size') == st.st_size and old.get('mtime_ns') == st.st_mtime_ns:
+        fp['sha256'] = old['sha256']
+        return fp
+    h = hashlib.sha256()
+    with open(path, 'rb') as f:
+        for block in iter(lambda: f.read(1 << 20), b''):
+            h.update(block)
+    fp['sha256'] = h.hexdigest()
+    return fp
+
+
+def read_state(path, params):
+    """Saved per-file and per-R rows, or an empty state if missing or made with other parameters."""
+    empty = {'params': params, 'files': {}, 'by_R': {}}
+    if not os.path.exists(path):
+        return empty
+    try:
+        with open(path) as f:
+            state = json.load(f)
+    except ValueError:
+        return empty
+    if state.get('params') != params:
+        return empty
+    return state
+
+
+def write_state(path, state):
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(state, f, indent=1, sort_keys=True)
+    os.replace(tmp, path)
+
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument('--posts', default='outputs/scan_postprocess')
     p.add_argument('--boot', type=int, default=2000)
+    p.add_argument('--seed', type=int, default=0, help='bootstrap seed')
+    p.add_argument('--max-mem-mb', type=float, default=256, help='memory ceiling for one chunk of bootstrap replicates')
+    p.add_argument('--jobs', type=int, default=1, help='worker processes for the bootstrap groups')
+    p.add_argument('--exact', action='store_true', help='exact bootstrap distribution of the median instead of resampling')
+    p.add_argument('--stream', action='store_true', help='chunked column loading and quantile sketches (memory independent of row count)')
+    p.add_argument('--sketch-size', type=int, default=2000, help='centroids per sketch in --stream mode')
+    p.add_argument('--full', action='store_true', help='ignore the saved state and recompute every group')
+    p.add_argument('--no-plots', action='store_true', help='only write the CSVs (matplotlib is not imported)')
+    p.add_argument('--startup-report', action='store_true', help='print per-module import times at exit')
     args = p.parse_args()
+    startup_report.mark_ready()
+    boot = dict(reps=args.boot, seed=args.seed, max_mem_mb=args.max_mem_mb, jobs=args.jobs, exact=args.exact)
 
     posts = args.posts
     stab_dir = os.path.join(posts, 'stability')
@@ -93,22 +568,57 @@ def main():
     if not files:
         raise SystemExit('no stability files found in '+stab_dir)
 
-    per_file_rows = []
-    by_R = {}
+    if args.stream and np is None:
+        raise SystemExit('--stream needs numpy')
+    params = {'version': STATE_VERSION, 'boot': args.boot, 'seed': args.seed, 'exact': args.exact,
+              'stream': args.stream, 'sketch_size': args.sketch_size if args.stream else None}
+    state_path = os.path.join(posts, STATE_NAME)
+    state = read_state(state_path, params)
+    if args.full:
+        state = {'params': params, 'files': {}, 'by_R': {}}
+    old_files = state['files']
 
+    # unchanged files keep their saved rows; new and changed ones are redone
+    entries = {}
+    changed = []
+    paths = {}
     for fp in files:
-        rows = read_stab_file(fp)
-        if not rows:
-            continue
-        lps = [r['Lprime'] for r in rows]
-        med, lo, hi = bootstrap_median(lps, reps=args.boot)
-        frac_pos = sum(1 for v in lps if v > 0)/len(lps)
-        n = len(lps)
-        # take R and Y from first row (all rows same file)
-        R = rows[0]['R']
-        Y = rows[0]['Y']
-        per_file_rows.append({'file':os.path.basename(fp),'R':R,'Y':Y,'n':n,'median':med,'lo':lo,'hi':hi,'frac_pos':frac_pos})
-        by_R.setdefault(R,[]).extend(lps)
+        name = os.path.basename(fp)
+        paths[name] = fp
+        old = old_files.get(name)
+        fpr = file_fingerprint(fp, old)
+        if old is not None and old['sha256'] == fpr['sha256'] and old['size'] == fpr['size']:
+            entries[name] = dict(old, **fpr)
+        else:
+            entries[name] = fpr
+            changed.append(fp)
+    removed = [name for name in old_files if name not in paths]
+
+    agg = Aggregator(boot, stream=args.stream, sketch_size=args.sketch_size)
+    touched = set()
+    for name in removed + [os.path.basename(fp) for fp in changed]:
+        old = old_files.get(name)
+        if old is not None and old['row'] is not None:
+            touched.add(old['row']['R'])
+    for name, row in agg.file_rows(changed).items():
+        entries[name]['row'] = row
+        if row is not None:
+            touched.add(row['R'])
+
+    R_files = {}
+    for name in sorted(entries):
+        row = entries[name]['row']
+        if row is not None and row['R'] in touched:
+            R_files.setdefault(row['R'], []).append(paths[name])
+    by_R = dict((k, r) for k, r in state['by_R'].items() if r['R'] not in touched)
+    for R, row in agg.R_rows(R_files).items():
+        by_R[repr(R)] = row
+    write_state(state_path, {'params': params, 'files': entries, 'by_R': by_R})
+    print('%d of %d stability files new or changed, %d removed; recomputed %d of %d R groups'
+          % (len(changed), len(files), len(removed), len(R_files), len(by_R)))
+
+    per_file_rows = [entries[name]['row'] for name in sorted(entries) if entries[name]['row'] is not None]
+    rows_R = sorted(by_R.values(), key=lambda r: r['R'])
 
     # write per-file summary
     ensure_dir(os.path.join(posts,'plots'))
@@ -119,13 +629,6 @@ def main():
         for r in per_file_rows:
             w.writerow(r)
 
-    # aggregate by R
-    rows_R = []
-    for R, samples in sorted(by_R.items()):
-        med, lo, hi = bootstrap_median(samples, reps=args.boot)
-        frac_pos = sum(1 for v in samples if v > 0)/len(samples)
-        rows_R.append({'R':R,'n':len(samples),'median':med,'lo':lo,'hi':hi,'frac_pos':frac_pos})
-
     R_out = os.path.join(posts,'stability_summary_by_R.csv')
     with open(R_out,'w',newline='') as f:
         w = csv.DictWriter(f, fieldnames=['R','n','median','lo','hi','frac_pos'])
@@ -134,7 +637,12 @@ def main():
             w.writerow(r)
 
     # plots
+    if args.no_plots:
+        print('Wrote:', file_out)
+        print('Wrote:', R_out)
+        return
     try:
+        plt = startup_report.pyplot()
         if plt is None:
             print('matplotlib not available; skipping plots')
             return
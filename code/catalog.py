@@ -0,0 +1,277 @@
+#!/usr/bin/env python3
+"""
+catalog.py
+Local SQLite catalog of eigenforms, their coefficient dumps and the derived
+quantities, so analyses can select inputs with a query instead of walking
+R_*/coeffs_R_*_Y_*.txt and parsing file names.
+
+Tables (all indexed on the columns queries filter on):
+
+  forms        id, R, symmetry, level, eigenvalue (1/4 + R^2), coeff_err
+  coeff_files  id, form_id, Y, M, path, mtime, size, hecke_err (quick a4
+               check), hecke_max, usable_M (hecke_check.py)
+  l_values     file_id, method, delta, smooth, L0, Lprime, M_eff, tail_bound
+  sign_tests   file_id, X, S_f
+
+`ingest` walks a postprocess directory once, takes coeff_err from its
+summary.txt and computes the rest from each dump; files whose mtime and size
+are unchanged since the last ingest are skipped, and rows for dumps under the
+directory that are no longer there are dropped. `query` lists matching
+files, e.g. all odd forms with 32 < R < 36 and coeff_err < 1e-9:
+
+  python3 catalog.py ingest --posts outputs/scan_postprocess
+  python3 catalog.py query --symmetry -1 --Rmin 32 --Rmax 36 --max-coeff-err 1e-9
+
+The analysis scripts (compute_L_derivative, compute_L_stats,
+run_stability_sweep, hecke_check, chebyshev_curves) take --catalog DB and
+the same filters (compute_L_derivative.add_selection_args) and read their
+inputs through compute_L_derivative.input_files(args), which imports this
+module only when --catalog is given and returns select_coeff_files, the
+(R, Y, path) tuples of iter_coeff_files.
+
+Default database: $MAASS_CATALOG, else outputs/catalog.sqlite.
+"""
+import os
+import csv
+import sys
+import sqlite3
+import argparse
+
+import numpy as np
+
+import compute_L_derivative as cld
+import dirichlet_series as ds
+import hecke_check
+import prime_sums
+from coeff_bank import hecke_a4_error, read_summary_errors
+
+SCHEMA_VERSION = 1
+DEFAULT_DB = os.environ.get('MAASS_CATALOG', os.path.join('outputs', 'catalog.sqlite'))
+DEFAULT_X = (500, 1000, 2000, 5000)
+QUERY_FIELDS = ['R', 'symmetry', 'level', 'Y', 'M', 'coeff_err', 'hecke_err', 'hecke_max', 'usable_M',
+                'L0', 'Lprime', 'path']
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS meta (key TEXT PRIMARY KEY, value TEXT);
+CREATE TABLE IF NOT EXISTS forms (
+    id INTEGER PRIMARY KEY,
+    R REAL NOT NULL,
+    symmetry INTEGER NOT NULL,
+    level INTEGER NOT NULL,
+    eigenvalue REAL,
+    coeff_err REAL,
+    UNIQUE (R, symmetry, level)
+);
+CREATE TABLE IF NOT EXISTS coeff_files (
+    id INTEGER PRIMARY KEY,
+    form_id INTEGER NOT NULL REFERENCES forms(id),
+    Y REAL,
+    M INTEGER,
+    path TEXT NOT NULL UNIQUE,
+    mtime REAL,
+    size INTEGER,
+    hecke_err REAL,
+    hecke_max REAL,
+    usable_M INTEGER
+);
+CREATE TABLE IF NOT EXISTS l_values (
+    file_id INTEGER NOT NULL REFERENCES coeff_files(id) ON DELETE CASCADE,
+    method TEXT NOT NULL,
+    delta REAL NOT NULL,
+    smooth REAL NOT NULL,
+    L0 REAL,
+    Lprime REAL,
+    M_eff INTEGER,
+    tail_bound REAL,
+    PRIMARY KEY (file_id, method, delta, smooth)
+);
+CREATE TABLE IF NOT EXISTS sign_tests (
+    file_id INTEGER NOT NULL REFERENCES coeff_files(id) ON DELETE CASCADE,
+    X REAL NOT NULL,
+    S_f REAL,
+    PRIMARY KEY (file_id, X)
+);
+CREATE INDEX IF NOT EXISTS forms_R ON forms (R);
+CREATE INDEX IF NOT EXISTS forms_symmetry ON forms (symmetry, R);
+CREATE INDEX IF NOT EXISTS forms_level ON forms (level, R);
+CREATE INDEX IF NOT EXISTS files_form ON coeff_files (form_id);
+CREATE INDEX IF NOT EXISTS files_Y ON coeff_files (Y);
+"""
+
+
+def connect(db=DEFAULT_DB):
+    """Open (creating if needed) the catalog and check its schema version."""
+    os.makedirs(os.path.dirname(os.path.abspath(db)), exist_ok=True)
+    con = sqlite3.connect(db)
+    con.execute('PRAGMA foreign_keys = ON')
+    con.executescript(SCHEMA)
+    row = con.execute("SELECT value FROM meta WHERE key = 'schema_version'").fetchone()
+    if row is None:
+        con.execute("INSERT INTO meta VALUES ('schema_version', ?)", (str(SCHEMA_VERSION),))
+        con.commit()
+    elif int(row[0]) != SCHEMA_VERSION:
+        raise SystemExit('catalog %s has schema version %s, expected %d' % (db, row[0], SCHEMA_VERSION))
+    return con
+
+
+def form_id(con, R, symmetry=-1, level=1, coeff_err=None):
+    """id of the form (R, symmetry, level), inserting it if new; a known coeff_err is kept up to date."""
+    row = con.execute('SELECT id FROM forms WHERE R = ? AND symmetry = ? AND level = ?',
+                      (R, symmetry, level)).fetchone()
+    if row is None:
+        cur = con.execute('INSERT INTO forms (R, symmetry, level, eigenvalue, coeff_err) VALUES (?, ?, ?, ?, ?)',
+                          (R, symmetry, level, 0.25 + R*R, coeff_err))
+        return cur.lastrowid
+    if coeff_err is not None:
+        con.execute('UPDATE forms SET coeff_err = ? WHERE id = ?', (coeff_err, row[0]))
+    return row[0]
+
+
+def ingest_file(con, R, Y, path, symmetry=-1, level=1, coeff_err=None,
+                Xs=DEFAULT_X, delta=0.01, smooth=2000.0):
+    """Catalog one dump with its Hecke checks, fd L-values and S_f; False if it could not be read."""
+    a = cld.read_coeff_file(path)
+    if not len(a):
+        return False
+    st = os.stat(path)
+    fid = form_id(con, R, symmetry, level, coeff_err)
+    hecke = hecke_check.hecke_report(a)
+    con.execute('DELETE FROM coeff_files WHERE path = ?', (path,))
+    cur = con.execute(
+        'INSERT INTO coeff_files (form_id, Y, M, path, mtime, size, hecke_err, hecke_max, usable_M) '
+        'VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?)',
+        (fid, Y, len(a), path, st.st_mtime, st.st_size, hecke_a4_error(a), hecke['hecke_max'], hecke['usable_M']))
+    file_id = cur.lastrowid
+    a_cut, M_eff, tail = cld.adaptive_cut(a, smooth, None, delta=delta)
+    Lm, L0, Lp = ds.L_values(a_cut, (0.5-delta, 0.5, 0.5+delta), smooth)
+    con.execute('INSERT INTO l_values VALUES (?, ?, ?, ?, ?, ?, ?, ?)',
+                (file_id, 'fd', delta, smooth, float(L0), float((Lp - Lm)/(2.0*delta)), M_eff, tail))
+    S = prime_sums.S_f(a, Xs)
+    con.executemany('INSERT INTO sign_tests VALUES (?, ?, ?)',
+                    [(file_id, float(X), float(s)) for X, s in zip(Xs, S)])
+    return True
+
+
+def ingest(con, posts_dir, summary=None, symmetry=-1, level=1, Xs=DEFAULT_X, delta=0.01, smooth=2000.0):
+    """
+    Catalog every dump under posts_dir (coeff_err from summary, default
+    <posts_dir>/summary.txt). Rows for dumps under posts_dir that the walk no
+    longer finds (deleted or moved) are removed with their derived values.
+    Returns (added, unchanged, removed) counts.
+    """
+    errs = read_summary_errors(summary or os.path.join(posts_dir, 'summary.txt'))
+    added = unchanged = 0
+    seen = set()
+    for R, Y, path in cld.iter_coeff_files(posts_dir):
+        path = os.path.abspath(path)
+        seen.add(path)
+        st = os.stat(path)
+        row = con.execute('SELECT mtime, size FROM coeff_files WHERE path = ?', (path,)).fetchone()
+        if row is not None and row[0] == st.st_mtime and row[1] == st.st_size:
+            unchanged += 1
+            continue
+        coeff_err = errs.get(os.path.basename(path), (None, None))[0]
+        if ingest_file(con, R, Y, path, symmetry, level, coeff_err, Xs, delta, smooth):
+            added += 1
+    prefix = os.path.join(os.path.abspath(posts_dir), '')
+    gone = [row[0] for row in con.execute("SELECT path FROM coeff_files WHERE substr(path, 1, ?) = ?",
+                                          (len(prefix), prefix)) if row[0] not in seen]
+    con.executemany('DELETE FROM coeff_files WHERE path = ?', [(path,) for path in gone])
+    con.execute('DELETE FROM forms WHERE id NOT IN (SELECT form_id FROM coeff_files)')
+    con.commit()
+    return added, unchanged, len(gone)
+
+
+def _where(Rmin=None, Rmax=None, symmetry=None, level=None, Y=None, max_coeff_err=None, max_hecke_err=None):
+    clauses, params = [], []
+    for clause, value in (('f.R > ?', Rmin), ('f.R < ?', Rmax), ('f.symmetry = ?', symmetry),
+                          ('f.level = ?', level), ('abs(c.Y - ?) < 5e-4', Y),
+                          ('f.coeff_err < ?', max_coeff_err), ('c.hecke_max < ?', max_hecke_err)):
+        if value is not None:
+            clauses.append(clause)
+            params.append(value)
+    return (' WHERE ' + ' AND '.join(clauses)) if clauses else '', params
+
+
+def query(con, delta=0.01, smooth=2000.0, **where):
+    """Dicts with QUERY_FIELDS for every matching coefficient file, in (R, Y) order."""
+    w, params = _where(**where)
+    sql = ('SELECT f.R, f.symmetry, f.level, c.Y, c.M, f.coeff_err, c.hecke_err, c.hecke_max, c.usable_M, '
+           'l.L0, l.Lprime, c.path FROM coeff_files c JOIN forms f ON f.id = c.form_id '
+           "LEFT JOIN l_values l ON l.file_id = c.id AND l.method = 'fd' AND l.delta = ? AND l.smooth = ?"
+           + w + ' ORDER BY f.R, c.Y, c.path')
+    return [dict(zip(QUERY_FIELDS, row)) for row in con.execute(sql, [delta, smooth] + params)]
+
+
+def select_coeff_files(db=DEFAULT_DB, **where):
+    """
+    (R, Y, path) for every catalogued dump matching the filters, like
+    cld.iter_coeff_files. Dumps that no longer exist are skipped with a
+    warning (re-run ingest to drop them).
+    """
+    con = connect(db)
+    try:
+        w, params = _where(**where)
+        sql = ('SELECT f.R, c.Y, c.path FROM coeff_files c JOIN forms f ON f.id = c.form_id'
+               + w + ' ORDER BY f.R, c.Y, c.path')
+        rows = [tuple(row) for row in con.execute(sql, params)]
+    finally:
+        con.close()
+    out = []
+    for R, Y, path in rows:
+        if os.path.exists(path):
+            out.append((R, Y, path))
+        else:
+            print('catalog: skipping missing coefficient file', path)
+    return out
+
+
+def _add_filters(p):
+    p.add_argument('--Rmin', type=float, default=None)
+    p.add_argument('--Rmax', type=float, default=None)
+    p.add_argument('--symmetry', type=int, default=None)
+    p.add_argument('--level', type=int, default=None)
+    p.add_argument('--Y', type=float, default=None)
+    p.add_argument('--max-coeff-err', type=float, default=None)
+    p.add_argument('--max-hecke-err', type=float, default=None, help='bound on the full Hecke check hecke_max')
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--db', default=DEFAULT_DB, help='catalog database')
+    sub = p.add_subparsers(dest='cmd', required=True)
+    pi = sub.add_parser('ingest', help='catalog the dumps of a postprocess directory')
+    pi.add_argument('--posts', default='outputs/scan_postprocess', help='postprocess outputs dir')
+    pi.add_argument('--summary', default=None, help='summary.txt with coeff_err (default: <posts>/summary.txt)')
+    pi.add_argument('--symmetry', type=int, default=-1)
+    pi.add_argument('--level', type=int, default=1)
+    pi.add_argument('--X', type=float, nargs='+', default=list(DEFAULT_X), help='sign-test X values')
+    pi.add_argument('--delta', type=float, default=0.01)
+    pi.add_argument('--smooth', type=float, default=2000.0)
+    pq = sub.add_parser('query', help='list catalogued files matching the filters')
+    _add_filters(pq)
+    pq.add_argument('--delta', type=float, default=0.01, help='L-values computed with this delta')
+    pq.add_argument('--smooth', type=float, default=2000.0, help='L-values computed with this smoothing')
+    pq.add_argument('--paths', action='store_true', help='print only the file paths')
+    args = p.parse_args()
+
+    con = connect(args.db)
+    if args.cmd == 'ingest':
+        added, unchanged, removed = ingest(con, args.posts, args.summary, args.symmetry, args.level,
+                                           args.X, args.delta, args.smooth)
+        print('%d files catalogued, %d unchanged, %d removed, in %s' % (added, unchanged, removed, args.db))
+        return
+    rows = query(con, delta=args.delta, smooth=args.smooth, Rmin=args.Rmin, Rmax=args.Rmax,
+                 symmetry=args.symmetry, level=args.level, Y=args.Y,
+                 max_coeff_err=args.max_coeff_err, max_hecke_err=args.max_hecke_err)
+    if args.paths:
+        for r in rows:
+            print(r['path'])
+        return
+    w = csv.DictWriter(sys.stdout, fieldnames=QUERY_FIELDS)
+    w.writeheader()
+    w.writerows(rows)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,151 @@
+#!/usr/bin/env python3
+"""
+chebyshev_curves.py
+Full S_f(X) curves for the chi3 sign test, instead of the four sample points
+X = 500, 1000, 2000, 5000.
+
+For each form the sharp-cutoff sum
+
+  S_f(X) = sum_{p <= X} a_p * chi3(p)
+
+is a step function that only changes at primes, so one cumulative sum over
+the primes p <= M gives it exactly for every X up to the largest prime <= M.
+From the steps we get, with no sampling error,
+  - the logarithmic density of {X : S_f(X) < 0} on [2, p_max],
+    (1/log(p_max/2)) * integral of dX/X over the set,
+  - the primes at which S_f changes sign.
+The curve is also sampled on a log-spaced X grid together with the smoothed
+sum S_f(X) = sum_p a_p chi3(p) exp(-p/X) used by the sign tests (see
+prime_sums.py); the log density of the smoothed sum being negative is the
+fraction of grid points where it is.
+
+Per form a compact <out>/curve_R_{R:.12f}_Y_{Y:.3f}.npz holds the arrays
+X, S_sharp, S_smooth and sign_changes; <out>/chebyshev_curves.csv has one
+row per form.
+
+Usage (run from code/):
+  python3 chebyshev_curves.py --posts outputs/scan_postprocess --points 2000
+  python3 chebyshev_curves.py --bank outputs/coeff_bank
+"""
+import os
+import csv
+import argparse
+
+import numpy as np
+
+import compute_L_derivative as cld
+import prime_sums
+
+FIELDS = ['R', 'Y', 'M', 'p_max', 'S_final', 'logdens_neg', 'logdens_neg_smooth',
+          'sign_changes', 'first_change', 'last_change', 'file']
+
+
+def sharp_steps(a):
+    """
+    (p, S) with p the primes <= len(a) other than 3 and S[k] the sharp sum
+    S_f(X) for p[k] <= X < p[k+1].
+    """
+    a = np.asarray(a, dtype=np.float64)
+    idx, p, chi = prime_sums.prime_tables(a.size)
+    return p, np.cumsum(a[idx] * chi)
+
+
+def sample_steps(p, S, Xs):
+    """The step function (p, S) evaluated at each X in `Xs` (0 below the first prime)."""
+    k = np.searchsorted(p, np.asarray(Xs, dtype=np.float64), side='right') - 1
+    return np.where(k >= 0, S[np.maximum(k, 0)], 0.0)
+
+
+def log_density_negative(p, S):
+    """Exact logarithmic density of S_f(X) < 0 on [p[0], p[-1]]."""
+    if p.size < 2:
+        return float('nan')
+    widths = np.diff(np.log(p))
+    return float(widths[S[:-1] < 0].sum() / widths.sum())
+
+
+def sign_changes(p, S):
+    """Primes at which the sign of S_f (negative vs non-negative) flips."""
+    neg = S < 0
+    return p[1:][neg[1:] != neg[:-1]]
+
+
+def curve(a, points=2000, xmin=2.0, max_mem_mb=prime_sums.MAX_MEM_MB):
+    """
+    All curve data for one coefficient array a[0]=a1, as a dict of arrays and
+    scalars. The smoothed curve is evaluated in X blocks whose kernel fits in
+    max_mem_mb.
+    """
+    p, S = sharp_steps(a)
+    if p.size == 0:
+        return None
+    p_max = p[-1]
+    X = np.geomspace(min(xmin, p_max), p_max, points)
+    S_smooth = prime_sums.S_f(a, X, max_mem_mb=max_mem_mb)
+    changes = sign_changes(p, S)
+    return {'X': X, 'S_sharp': sample_steps(p, S, X), 'S_smooth': S_smooth,
+            'sign_changes': changes, 'p_max': p_max, 'S_final': S[-1],
+            'logdens_neg': log_density_negative(p, S),
+            'logdens_neg_smooth': float(np.mean(S_smooth < 0))}
+
+
+def iter_forms(posts=None, bank=None, files=None):
+    """
+    Yield (R, Y, a, source) from a postprocess directory, a coefficient bank,
+    or a list of (R, Y, path) tuples (a catalog query).
+    """
+    if bank:
+        import coeff_bank
+        b = coeff_bank.CoeffBank(bank)
+        for i, m in enumerate(b.meta):
+            yield m['R'], m['Y'], b.row(i), m['source']
+        return
+    for R, Y, path in (cld.iter_coeff_files(posts) if files is None else files):
+        a = cld.read_coeff_file(path)
+        if len(a):
+            yield R, Y, a, path
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--posts', default='outputs/scan_postprocess', help='postprocess outputs dir')
+    p.add_argument('--bank', default=None, help='read forms from a coefficient bank instead of --posts')
+    p.add_argument('--out', default=None, help='output directory (default: <posts>/chebyshev_curves)')
+    p.add_argument('--points', type=int, default=2000, help='log-spaced X grid size')
+    p.add_argument('--xmin', type=float, default=2.0, help='smallest X on the grid')
+    p.add_argument('--max-mem-mb', type=float, default=prime_sums.MAX_MEM_MB,
+                   help='memory budget for one block of the smoothed-sum kernel')
+    cld.add_selection_args(p)
+    args = p.parse_args()
+
+    out = args.out or os.path.join(args.bank or args.posts, 'chebyshev_curves')
+    os.makedirs(out, exist_ok=True)
+    rows = []
+    files = cld.input_files(args) if args.catalog else None
+    for R, Y, a, source in iter_forms(args.posts, args.bank, files):
+        c = curve(a, points=args.points, xmin=args.xmin, max_mem_mb=args.max_mem_mb)
+        if c is None:
+            continue
+        fn = os.path.join(out, f'curve_R_{R:.12f}_Y_{Y:.3f}.npz')
+        np.savez_compressed(fn, X=c['X'], S_sharp=c['S_sharp'], S_smooth=c['S_smooth'],
+                            sign_changes=c['sign_changes'])
+        ch = c['sign_changes']
+        rows.append({'R': f'{R:.12f}', 'Y': f'{Y:.3f}', 'M': len(a), 'p_max': int(c['p_max']),
+                     'S_final': f"{c['S_final']:+.6f}", 'logdens_neg': f"{c['logdens_neg']:.6f}",
+                     'logdens_neg_smooth': f"{c['logdens_neg_smooth']:.6f}",
+                     'sign_changes': len(ch),
+                     'first_change': int(ch[0]) if len(ch) else '',
+                     'last_change': int(ch[-1]) if len(ch) else '',
+                     'file': fn})
+        print(f"R={R:.12f} Y={Y:.3f} p_max={int(c['p_max'])} logdens(S<0)={c['logdens_neg']:.4f} "
+              f"smoothed={c['logdens_neg_smooth']:.4f} sign changes={len(ch)}")
+    outcsv = os.path.join(out, 'chebyshev_curves.csv')
+    with open(outcsv, 'w', newline='') as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        w.writerows(rows)
+    print('Wrote', outcsv)
+
+
+if __name__ == '__main__':
+    main()
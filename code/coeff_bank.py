@@ -0,0 +1,301 @@
+#!/usr/bin/env python3
+"""
+coeff_bank.py
+A single on-disk "coefficient bank" for all eigenforms, replacing the
+per-form text dumps as the input to bulk analyses.
+
+A bank is a directory holding
+
+  bank.json       the current generation: {"generation", "coeffs", "index", "forms"}
+  coeffs.<g>.npy  float64 array of shape (capacity, width), row i = a_1..a_M of
+                  form i, zero-padded to the width of the longest form; rows
+                  past "forms" are spare capacity. Opened memory-mapped
+  index.<g>.csv   one row per form: R, Y, symmetry, M, coeff_err, hecke_err, source
+
+An append writes its rows into the spare capacity of the current matrix (or,
+when rows or width run out, into a new matrix with twice the rows), writes
+the index of the next generation, and then replaces bank.json. That rename is
+the only step that makes the append visible: after a crash before it, readers
+still see the previous generation, whose rows are never touched. Banks in the
+older layout (coeffs.npy + index.csv) are read as generation 0 and converted
+by the next append.
+
+Because the padding is zero, the smoothed L-series of every form at once is
+one matrix product with dirichlet_series.series_weights.
+
+Usage (run from code/):
+  python3 coeff_bank.py import --posts outputs/scan_postprocess --bank outputs/coeff_bank
+  python3 coeff_bank.py info --bank outputs/coeff_bank
+  python3 coeff_bank.py lvalues --bank outputs/coeff_bank --delta 0.01 --smooth 2000
+"""
+import os
+import re
+import csv
+import json
+import argparse
+
+import numpy as np
+
+import compute_L_derivative as cld
+import dirichlet_series as ds
+
+POINTER_NAME = 'bank.json'
+COEFFS_NAME = 'coeffs.npy'
+INDEX_NAME = 'index.csv'
+INDEX_FIELDS = ['R', 'Y', 'symmetry', 'M', 'coeff_err', 'hecke_err', 'source']
+
+SUMMARY_RE = re.compile(r"R=([0-9\.]+) Y=([0-9\.]+) M=([0-9]+) hecke_err=([0-9\.eE+-]+|nan) coeff_err=([0-9\.eE+-]+|inf|nan) coeffile=(\S+)")
+
+
+def hecke_a4_error(a):
+    """|a4 - (a2^2 - 1)|, the quick check used by the sign tests."""
+    if len(a) < 4:
+        return float('nan')
+    return abs(a[3] - (a[1]**2 - 1))
+
+
+class CoeffBank(object):
+    """
+    Read access to a coefficient bank directory. The coefficient matrix is
+    memory-mapped, so opening a bank costs one small CSV read regardless of
+    how many forms it holds.
+    """
+
+    def __init__(self, path):
+        self.path = path
+        ptr = read_pointer(path)
+        self.meta = read_index(os.path.join(path, ptr['index'])) if ptr else []
+        if ptr and len(self.meta) != ptr['forms']:
+            raise ValueError('bank %s: index %s has %d rows, expected %d'
+                             % (path, ptr['index'], len(self.meta), ptr['forms']))
+        self.lengths = np.array([m['M'] for m in self.meta], dtype=np.int64)
+        if self.meta:
+            full = np.load(os.path.join(path, ptr['coeffs']), mmap_mode='r')
+            if full.shape[0] < len(self.meta) or full.shape[1] < self.lengths.max():
+                raise ValueError('bank %s: coefficient array %s too small for %d forms of length <= %d'
+                                 % (path, full.shape, len(self.meta), self.lengths.max()))
+            # rows past the committed count are spare capacity
+            self.coeffs = full[:len(self.meta)]
+        else:
+            self.coeffs = np.zeros((0, 0))
+
+    def __len__(self):
+        return len(self.meta)
+
+    @property
+    def width(self):
+        return self.coeffs.shape[1]
+
+    def row(self, i):
+        """Coefficients a_1..a_M of form i (a view into the memory map)."""
+        return self.coeffs[i, :self.lengths[i]]
+
+    def L_values(self, s_values, smooth):
+        """
+        Smoothed L-series of every form at each s: array (forms, len(s_values)).
+        """
+        W = ds.series_weights(self.width, s_values, smooth)
+        return self.coeffs @ W.T
+
+
+def read_index(path):
+    meta = []
+    if not os.path.exists(path):
+        return meta
+    with open(path, 'r', newline='') as f:
+        for r in csv.DictReader(f):
+            meta.append({'R': float(r['R']), 'Y': float(r['Y']),
+                         'symmetry': int(r['symmetry']), 'M': int(r['M']),
+                         'coeff_err': float(r['coeff_err']),
+                         'hecke_err': float(r['hecke_err']),
+                         'source': r['source']})
+    return meta
+
+
+def read_pointer(bank_dir):
+    """
+    The bank's current generation as a dict (generation, coeffs, index,
+    forms), the old two-file layout as generation 0, or None for an empty bank.
+    """
+    path = os.path.join(bank_dir, POINTER_NAME)
+    if os.path.exists(path):
+        with open(path) as f:
+            return json.load(f)
+    if os.path.exists(os.path.join(bank_dir, INDEX_NAME)):
+        return {'generation': 0, 'coeffs': COEFFS_NAME, 'index': INDEX_NAME,
+                'forms': len(read_index(os.path.join(bank_dir, INDEX_NAME)))}
+    return None
+
+
+def write_pointer(bank_dir, ptr):
+    path = os.path.join(bank_dir, POINTER_NAME)
+    tmp = path + '.tmp'
+    with open(tmp, 'w') as f:
+        json.dump(ptr, f)
+        f.flush()
+        os.fsync(f.fileno())
+    os.replace(tmp, path)
+
+
+def write_index(path, meta):
+    tmp = path + '.tmp'
+    with open(tmp, 'w', newline='') as f:
+        w = csv.DictWriter(f, fieldnames=INDEX_FIELDS)
+        w.writeheader()
+        for m in meta:
+            w.writerow({'R': '%.15g' % m['R'], 'Y': '%.3f' % m['Y'],
+                        'symmetry': m['symmetry'], 'M': m['M'],
+                        'coeff_err': '%.6e' % m['coeff_err'],
+                        'hecke_err': '%.6e' % m['hecke_err'],
+                        'source': m['source']})
+    os.replace(tmp, path)
+
+
+def append_forms(bank_dir, forms, chunk=256):
+    """
+    Append `forms` to the bank in `bank_dir` (created if missing).
+
+    `forms` is a list of (a, meta) with a the coefficient sequence (a[0]=a1)
+    and meta a dict with keys R, Y and optionally symmetry, coeff_err,
+    hecke_err, source. The rows go into the spare capacity of the current
+    matrix when it is large enough; otherwise existing rows are copied in
+    chunks into a new matrix with room to grow. Either way the append only
+    becomes visible when bank.json is replaced, so a crash never leaves a
+    half-written bank.
+    """
+    if not forms:
+        return
+    os.makedirs(bank_dir, exist_ok=True)
+    ptr = read_pointer(bank_dir)
+    meta = read_index(os.path.join(bank_dir, ptr['index'])) if ptr else []
+    nold = len(meta)
+    gen = (ptr['generation'] if ptr else 0) + 1
+    old = np.load(os.path.join(bank_dir, ptr['coeffs']), mmap_mode='r+') if meta else None
+    nrows = nold + len(forms)
+    width = max([old.shape[1] if old is not None else 0] + [len(a) for a, _ in forms])
+
+    if old is not None and ptr['generation'] > 0 and old.shape[0] >= nrows and old.shape[1] >= width:
+        coeffs_name = ptr['coeffs']
+        out = old
+    else:
+        coeffs_name = 'coeffs.%d.npy' % gen
+        out = np.lib.format.open_memmap(os.path.join(bank_dir, coeffs_name), mode='w+', dtype=np.float64,
+                                        shape=(max(nrows, 2*nold), width))
+        for i in range(0, nold, chunk):
+            block = old[i:i+chunk]
+            out[i:i+block.shape[0], :block.shape[1]] = block
+            out[i:i+block.shape[0], block.shape[1]:] = 0.0
+    for k, (a, m) in enumerate(forms):
+        a = np.asarray(a, dtype=np.float64)
+        out[nold+k, :a.size] = a
+        out[nold+k, a.size:] = 0.0
+        meta.append({'R': float(m['R']), 'Y': float(m['Y']),
+                     'symmetry': int(m.get('symmetry', -1)), 'M': int(a.size),
+                     'coeff_err': float(m.get('coeff_err', float('nan'))),
+                     'hecke_err': float(m.get('hecke_err', hecke_a4_error(a))),
+                     'source': m.get('source', '')})
+    out.flush()
+    del out
+    del old
+    index_name = 'index.%d.csv' % gen
+    write_index(os.path.join(bank_dir, index_name), meta)
+    write_pointer(bank_dir, {'generation': gen, 'coeffs': coeffs_name, 'index': index_name, 'forms': len(meta)})
+    # the previous generation's files are no longer referenced
+    if ptr:
+        for name in set((ptr['index'], ptr['coeffs'])) - set((index_name, coeffs_name)):
+            try:
+                os.remove(os.path.join(bank_dir, name))
+            except OSError:
+                pass
+
+
+def read_summary_errors(summary):
+    """Map coefficient-file basename -> (coeff_err, hecke_err) from summary.txt."""
+    errs = {}
+    if not summary or not os.path.exists(summary):
+        return errs
+    with open(summary) as f:
+        for line in f:
+            m = SUMMARY_RE.match(line.strip())
+            if m:
+                errs[os.path.basename(m.group(6))] = (float(m.group(5)), float(m.group(4)))
+    return errs
+
+
+def form_key(R, Y, symmetry):
+    """Identity of a banked form: R and Y at the precision of the dump file names."""
+    return ('%.12f' % R, '%.3f' % Y, int(symmetry))
+
+
+def import_text_dumps(posts_dir, bank_dir, summary=None, symmetry=-1):
+    """
+    Import every coeffs_R_*_Y_*.txt under `posts_dir` whose form (R, Y,
+    symmetry, at the precision of the file names) is not already in the
+    bank, so re-importing from anywhere adds nothing. coeff_err and
+    hecke_err are taken from postprocess summary.txt when available;
+    otherwise hecke_err is recomputed and coeff_err is nan. The source
+    recorded is the absolute path of the dump.
+    """
+    if summary is None:
+        summary = os.path.join(posts_dir, 'summary.txt')
+    errs = read_summary_errors(summary)
+    ptr = read_pointer(bank_dir)
+    meta = read_index(os.path.join(bank_dir, ptr['index'])) if ptr else []
+    known = set(form_key(m['R'], m['Y'], m['symmetry']) for m in meta)
+    forms = []
+    for R, Y, path in cld.iter_coeff_files(posts_dir):
+        key = form_key(R, Y, symmetry)
+        if key in known:
+            continue
+        known.add(key)
+        source = os.path.abspath(path)
+        a = cld.read_coeff_file(path)
+        if not len(a):
+            continue
+        coeff_err, hecke_err = errs.get(os.path.basename(path), (float('nan'), hecke_a4_error(a)))
+        forms.append((a, {'R': R, 'Y': Y, 'symmetry': symmetry, 'coeff_err': coeff_err,
+                          'hecke_err': hecke_err, 'source': source}))
+    append_forms(bank_dir, forms)
+    return len(forms)
+
+
+def main():
+    p = argparse.ArgumentParser()
+    sub = p.add_subparsers(dest='cmd')
+    pi = sub.add_parser('import', help='import text coefficient dumps into a bank')
+    pi.add_argument('--posts', default='outputs/scan_postprocess')
+    pi.add_argument('--bank', default='outputs/coeff_bank')
+    pi.add_argument('--summary', default=None, help='summary.txt with coeff_err (default: <posts>/summary.txt)')
+    pi.add_argument('--symmetry', type=int, default=-1)
+    pn = sub.add_parser('info', help='list the forms in a bank')
+    pn.add_argument('--bank', default='outputs/coeff_bank')
+    pl = sub.add_parser('lvalues', help="L(1/2) and finite-difference L'(1/2) for every form")
+    pl.add_argument('--bank', default='outputs/coeff_bank')
+    pl.add_argument('--delta', type=float, default=0.01)
+    pl.add_argument('--smooth', type=float, default=2000.0)
+    args = p.parse_args()
+
+    if args.cmd == 'import':
+        n = import_text_dumps(args.posts, args.bank, summary=args.summary, symmetry=args.symmetry)
+        print('Imported', n, 'forms into', args.bank)
+    elif args.cmd == 'info':
+        bank = CoeffBank(args.bank)
+        print('# %d forms, width %d' % (len(bank), bank.width))
+        for m in bank.meta:
+            print('R=%.12f Y=%.3f sym=%+d M=%d coeff_err=%.3e hecke_err=%.3e  %s'
+                  % (m['R'], m['Y'], m['symmetry'], m['M'], m['coeff_err'], m['hecke_err'], m['source']))
+    elif args.cmd == 'lvalues':
+        bank = CoeffBank(args.bank)
+        s0 = 0.5
+        L = bank.L_values((s0-args.delta, s0, s0+args.delta), args.smooth)
+        deriv = (L[:, 2] - L[:, 0]) / (2.0*args.delta)
+        print('# R, Y, M, L(1/2), L\'(1/2) (delta=%g smooth=%g)' % (args.delta, args.smooth))
+        for m, L0, d in sorted(zip(bank.meta, L[:, 1], deriv), key=lambda r: (r[0]['R'], r[0]['Y'])):
+            print('R=%.12f Y=%.3f M=%d L(1/2)=%+.6e L\'(1/2)=%+.6e  file=%s'
+                  % (m['R'], m['Y'], m['M'], L0, d, m['source']))
+    else:
+        p.print_help()
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,69 @@
+"""
+coeff_bounds.py
+Pointwise bounds for the Hecke eigenvalues of a level one Maass form, used to
+bound the neglected tails of truncated sums.
+
+  |a_n| <= d(n) * n^theta,  theta = 7/64 (Kim-Sarnak), 0 under Ramanujan,
+
+with d(n) the number of divisors of n.
+
+For the smoothed sums the neglected tail sum_{n > N} |term_n| is bounded by
+summing these bounds up to a table length T and by an integral past T, with
+d(n) <= 2 sqrt(n) there (tail_bounds, table_length).
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+KIM_SARNAK = 7.0/64
+
+
+@lru_cache(maxsize=8)
+def divisor_counts(N):
+    """d(n) for 1 <= n <= N as an int64 array d[n-1] (read-only)."""
+    d = np.zeros(N+1, dtype=np.int64)
+    for k in range(1, N+1):
+        d[k::k] += 1
+    d = d[1:]
+    d.flags.writeable = False
+    return d
+
+
+def coeff_bound(N, theta=KIM_SARNAK):
+    """Upper bounds b[n-1] >= |a_n| for 1 <= n <= N."""
+    n = np.arange(1, N+1, dtype=np.float64)
+    return divisor_counts(N) * n**theta
+
+
+def table_length(M, alpha, scale):
+    """
+    Table length T >= M past which n^alpha exp(-n/scale) is decreasing fast
+    enough for the closed-form integral bound in tail_bounds.
+    """
+    return max(int(M), int(math.ceil(2*max(alpha, 0.0)*scale)) + 1, 1)
+
+
+def tail_bounds(terms, alpha, scale, const=2.0):
+    """
+    t[i] >= sum_{n > i} |term_n| for 0 <= i <= T = len(terms).
+
+    terms[n-1] bounds the n-th term for n <= T; past T the n-th term is at
+    most const * n^alpha * exp(-n/scale). T must be at least
+    table_length(0, alpha, scale), so that the sum past T is below
+
+      int_T^oo const x^alpha e^{-x/scale} dx <= const T^alpha e^{-T/scale} * (2 scale if alpha > 0 else scale).
+    """
+    terms = np.asarray(terms, dtype=np.float64)
+    T = terms.size
+    if T < table_length(0, alpha, scale):
+        raise ValueError('table of length %d too short for alpha=%g scale=%g' % (T, alpha, scale))
+    beyond = const * math.exp(alpha*math.log(T) - T/scale) * (2*scale if alpha > 0 else scale)
+    return np.concatenate((np.cumsum(terms[::-1])[::-1], [0.0])) + beyond
+
+
+def truncation_point(tail, M, tol):
+    """Smallest N <= M with tail[N] <= tol, else M; returns (N, tail[N])."""
+    ok = np.flatnonzero(tail[:M+1] <= tol)
+    N = int(ok[0]) if ok.size else int(M)
+    return N, float(tail[N])
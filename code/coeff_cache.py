@@ -0,0 +1,176 @@
+#!/usr/bin/env python3
+"""
+coeff_cache.py
+Disk-backed cache for maass_form_coeffs(Y, R, symmetry) results.
+
+Entries are keyed on (R at full precision, Y, symmetry, level, SOLVER_VERSION)
+and stored content-addressed as <root>/<hh>/<sha256>.npz holding the float64
+coefficient vector (the same floats every caller takes from the mpmath
+solution). Writes go to a temporary file that is renamed into place, so
+concurrent workers never see a partial entry. Hits refresh the entry's mtime,
+and when the cache grows past its size bound the least recently used entries
+are evicted.
+
+The solver is only imported on a miss, so re-running a sign test or sweep on
+a known form costs a file read and does not need the Sage extension.
+
+Cache location: $MAASS_COEFF_CACHE, default code/cache/maass_coeffs.
+Size bound:     $MAASS_COEFF_CACHE_MB (megabytes), default 1024.
+
+Usage:
+  python3 coeff_cache.py            # print entry count and size
+  python3 coeff_cache.py --clear
+"""
+import os
+import hashlib
+import argparse
+import tempfile
+
+import numpy as np
+
+# Bump whenever maass_levelone_computations changes in a way that alters
+# the coefficients it returns; old entries then simply stop matching.
+SOLVER_VERSION = 'levelone-1'
+
+DEFAULT_ROOT = os.environ.get('MAASS_COEFF_CACHE',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'maass_coeffs'))
+DEFAULT_MAX_BYTES = int(float(os.environ.get('MAASS_COEFF_CACHE_MB', 1024)) * 2**20)
+
+
+def canonical(x):
+    """Exact text form of R or Y: float.hex for Python numbers, str() for mpmath/Sage reals."""
+    if isinstance(x, (int, float)):
+        return float(x).hex()
+    return str(x)
+
+
+class CoeffCache(object):
+
+    def __init__(self, root=DEFAULT_ROOT, max_bytes=DEFAULT_MAX_BYTES):
+        self.root = root
+        self.max_bytes = max_bytes
+        self.hits = 0
+        self.misses = 0
+
+    def key(self, Y, R, symmetry=-1, level=1):
+        text = 'R=%s Y=%s symmetry=%d level=%d solver=%s' % (
+            canonical(R), canonical(Y), int(symmetry), int(level), SOLVER_VERSION)
+        return hashlib.sha256(text.encode()).hexdigest(), text
+
+    def _path(self, digest):
+        return os.path.join(self.root, digest[:2], digest + '.npz')
+
+    def get(self, Y, R, symmetry=-1, level=1):
+        digest, text = self.key(Y, R, symmetry, level)
+        path = self._path(digest)
+        try:
+            with np.load(path) as z:
+                if str(z['key']) != text:
+                    return None
+                coeffs = z['coeffs']
+        except (OSError, KeyError, ValueError):
+            return None
+        try:
+            os.utime(path)
+        except OSError:
+            pass
+        return coeffs
+
+    def put(self, Y, R, coeffs, symmetry=-1, level=1):
+        digest, text = self.key(Y, R, symmetry, level)
+        path = self._path(digest)
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(path), suffix='.tmp')
+        try:
+            with os.fdopen(fd, 'wb') as f:
+                np.savez(f, coeffs=np.asarray(coeffs, dtype=np.float64), key=np.array(text))
+            os.replace(tmp, path)
+        except BaseException:
+            if os.path.exists(tmp):
+                os.remove(tmp)
+            raise
+        self.evict()
+
+    def entries(self):
+        """List of (mtime, size, path) for every entry."""
+        out = []
+        if not os.path.isdir(self.root):
+            return out
+        for sub in os.scandir(self.root):
+            if not sub.is_dir():
+                continue
+            for e in os.scandir(sub.path):
+                if e.name.endswith('.npz'):
+                    st = e.stat()
+                    out.append((st.st_mtime, st.st_size, e.path))
+        return out
+
+    def evict(self):
+        """Delete least recently used entries until the cache fits max_bytes."""
+        entries = self.entries()
+        total = sum(size for _, size, _ in entries)
+        if total <= self.max_bytes:
+            return
+        for _, size, path in sorted(entries):
+            try:
+                os.remove(path)
+            except OSError:
+                continue
+            total -= size
+            if total <= self.max_bytes:
+                break
+
+    def coeffs(self, Y, R, symmetry=-1, level=1):
+        """maass_form_coeffs(Y, R, symmetry) through the cache."""
+        c = self.get(Y, R, symmetry, level)
+        if c is not None:
+            self.hits += 1
+            return c
+        self.misses += 1
+        if level != 1:
+            raise ValueError('only the level one solver is wired to the cache')
+        from maass_levelone_computations import maass_form_coeffs as solve
+        c = np.array([float(v) for v in solve(Y, R, symmetry=symmetry)])
+        self.put(Y, R, c, symmetry, level)
+        return c
+
+    def report(self):
+        entries = self.entries()
+        size = sum(s for _, s, _ in entries)
+        return 'coeff cache: %d hits, %d misses; %d entries, %.1f MB in %s' % (
+            self.hits, self.misses, len(entries), size / 2.0**20, self.root)
+
+
+_default = None
+
+
+def default_cache():
+    global _default
+    if _default is None:
+        _default = CoeffCache()
+    return _default
+
+
+def maass_form_coeffs(Y, R, symmetry=-1):
+    """Drop-in replacement for the solver's maass_form_coeffs, served from the default cache."""
+    return default_cache().coeffs(Y, R, symmetry=symmetry)
+
+
+def report():
+    return default_cache().report()
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--root', default=DEFAULT_ROOT, help='cache directory')
+    p.add_argument('--clear', action='store_true', help='delete every entry')
+    args = p.parse_args()
+    cache = CoeffCache(args.root)
+    if args.clear:
+        for _, _, path in cache.entries():
+            os.remove(path)
+    print(cache.report())
+
+
+if __name__ == '__main__':
+    main()
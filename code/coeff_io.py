@@ -0,0 +1,90 @@
+"""
+coeff_io.py
+The one loader for coefficient dumps written by postprocess_scan_results.py,
+one "index value" pair per line:
+
+  1 1.0000000000000000e+00
+  2 4.4068159556546238e-01
+  ...
+
+The whole file is split and converted to float64 in one vectorized call, the
+index column is checked (integers, no duplicates, no gaps starting from 1) and
+the values are returned as a contiguous read-only array a[0]=a1.
+
+Loaded arrays are kept in an in-process cache keyed by (path, mtime, size),
+so sweeps and repeated analyses in the same process never reparse a file that
+has not changed on disk.
+"""
+import os
+from collections import OrderedDict
+
+import numpy as np
+
+CACHE_SIZE = 512
+
+_cache = OrderedDict()
+
+EMPTY = np.zeros(0)
+EMPTY.flags.writeable = False
+
+
+class CoeffFileError(ValueError):
+    """A coefficient dump that does not follow the `index value` format."""
+
+
+def parse_coeff_file(path):
+    """Parse a dump into a float64 array, raising CoeffFileError on bad input."""
+    with open(path, 'rb') as f:
+        data = f.read()
+    tokens = data.split()
+    if not tokens:
+        return np.zeros(0)
+    nlines = sum(1 for line in data.splitlines() if line.strip())
+    if len(tokens) != 2*nlines:
+        raise CoeffFileError('%s: expected 2 columns per line, got %d tokens on %d lines'
+                             % (path, len(tokens), nlines))
+    try:
+        pairs = np.array(tokens, dtype=np.float64).reshape(-1, 2)
+    except ValueError as e:
+        raise CoeffFileError('%s: %s' % (path, e))
+    idx = pairs[:, 0]
+    vals = pairs[:, 1]
+    M = idx.size
+    if np.array_equal(idx, np.arange(1, M+1)):
+        return np.ascontiguousarray(vals)
+    if not np.all(idx == np.floor(idx)) or idx.min() < 1:
+        raise CoeffFileError('%s: indices must be positive integers' % path)
+    iidx = idx.astype(np.int64)
+    uniq, counts = np.unique(iidx, return_counts=True)
+    if np.any(counts > 1):
+        raise CoeffFileError('%s: duplicate indices %s' % (path, uniq[counts > 1][:10].tolist()))
+    missing = np.setdiff1d(np.arange(1, uniq[-1]+1), uniq)
+    if missing.size:
+        raise CoeffFileError('%s: missing indices %s' % (path, missing[:10].tolist()))
+    out = np.empty(M)
+    out[iidx-1] = vals
+    return out
+
+
+def load_coeffs(path):
+    """
+    Return a_1..a_M from the dump at `path` as a read-only float64 array,
+    reusing the cached array if the file's mtime and size are unchanged.
+    """
+    key = os.path.abspath(path)
+    st = os.stat(key)
+    stamp = (st.st_mtime_ns, st.st_size)
+    hit = _cache.get(key)
+    if hit is not None and hit[0] == stamp:
+        _cache.move_to_end(key)
+        return hit[1]
+    arr = parse_coeff_file(key)
+    arr.flags.writeable = False
+    _cache[key] = (stamp, arr)
+    if len(_cache) > CACHE_SIZE:
+        _cache.popitem(last=False)
+    return arr
+
+
+def clear_cache():
+    _cache.clear()
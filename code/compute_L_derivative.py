@@ -10,74 +10,65 @@ and a central finite-difference for the derivative:
 
   L'(1/2) ≈ (L(1/2+delta) - L(1/2-delta)) / (2*delta)
 
+With --method analytic the derivatives are instead taken term by term,
+L^(k)(1/2) = sum a_n chi3(n) (-log n)^k n^{-1/2} exp(-n/SMOOTH), so L, L', L''
+(up to --order) come out of one pass with no delta.
+
 Usage (inside Sage container, run from code/):
   sage -python compute_L_derivative.py --posts outputs/scan_postprocess --delta 0.01 --smooth 2000
 
+The series is evaluated by dirichlet_series.L_values, which computes all
+three points (1/2-delta, 1/2, 1/2+delta) in one batched pass.
+
+With --tol the sum stops at the fewest coefficients M_eff for which the
+Kim-Sarnak bound |a_n| <= d(n) n^{7/64} puts the rest of the series (also the
+part past M) below the tolerance; M_eff and the tail bound are printed.
+
 Outputs a small table: R, Y, M, L(1/2), L'(1/2).
 """
+import startup_report
+startup_report.install_from_argv()
+
 import os
-import math
 import argparse
 
-
-def chi3(n):
-    r = n % 3
-    return 0 if r == 0 else (1 if r == 1 else -1)
+import coeff_io
+import dirichlet_series as ds
 
 
 def read_coeff_file(path):
-    # expect lines: index value
-    a = {}
-    with open(path, 'r') as f:
-        for line in f:
-            line = line.strip()
-            if not line:
-                continue
-            parts = line.split()
-            if len(parts) >= 2:
-                try:
-                    idx = int(parts[0])
-                    val = float(parts[1])
-                    a[idx] = val
-                except Exception:
-                    continue
-    # return list a[1..M]
-    if not a:
-        return []
-    M = max(a.keys())
-    arr = [a.get(i, 0.0) for i in range(1, M+1)]
-    return arr
+    """
+    Coefficients a_1..a_M of a dump as a float64 array (a[0]=a1), via the
+    shared cached loader in coeff_io. A malformed file (missing or duplicate
+    indices, wrong column count) is reported and returned as empty.
+    """
+    try:
+        return coeff_io.load_coeffs(path)
+    except coeff_io.CoeffFileError as e:
+        print('skipping malformed coefficient file:', e)
+        return coeff_io.EMPTY
 
 
 def L_of_s(a, s, smooth):
     # a is list with a[0]=a1
-    tot = 0.0
-    for n, an in enumerate(a, start=1):
-        c = chi3(n)
-        if c == 0:
-            continue
-        tot += an * c * (n**(-s)) * math.exp(-n/float(smooth))
-    return tot
+    return float(ds.L_values(a, (s,), smooth)[0])
 
 
-def process_posts_dir(posts_dir, delta, smooth):
-    results = []
-    # expect folders R_*/ with coeff files coeffs_R_..._Y_...txt
+def iter_coeff_files(posts_dir):
+    """
+    Yield (R, Y, path) for every coefficient dump under `posts_dir`.
+
+    Expects folders R_*/ holding files coeffs_R_{R:.12f}_Y_{Y:.3f}.txt;
+    R and Y are recovered from the file name (nan if it does not parse).
+    """
     if not os.path.isdir(posts_dir):
         raise SystemExit('posts dir not found: '+posts_dir)
     for entry in sorted(os.listdir(posts_dir)):
         sub = os.path.join(posts_dir, entry)
         if not os.path.isdir(sub):
             continue
-        # find coeff files
         for fn in sorted(os.listdir(sub)):
             if fn.startswith('coeffs_') and fn.endswith('.txt'):
-                path = os.path.join(sub, fn)
-                a = read_coeff_file(path)
-                if not a:
-                    continue
-                # extract R and Y from filename
-                # coeffs_R_{R:.12f}_Y_{Y:.3f}.txt
                 parts = fn.split('_')
                 try:
                     R = float(parts[2])
@@ -85,29 +76,150 @@ def process_posts_dir(posts_dir, delta, smooth):
                 except Exception:
                     R = float('nan')
                     Y = float('nan')
-                s0 = 0.5
-                Lp = L_of_s(a, s0+delta, smooth)
-                Lm = L_of_s(a, s0-delta, smooth)
-                L0 = L_of_s(a, s0, smooth)
-                deriv = (Lp - Lm) / (2.0*delta)
-                results.append((R, Y, len(a), L0, deriv, path))
+                yield R, Y, os.path.join(sub, fn)
+
+
+def add_selection_args(p):
+    """--catalog and its filters (see catalog.py), for the analysis scripts."""
+    p.add_argument('--catalog', default=None, help='select coefficient files from this catalog instead of --posts')
+    p.add_argument('--Rmin', type=float, default=None, help='with --catalog: only R > Rmin')
+    p.add_argument('--Rmax', type=float, default=None, help='with --catalog: only R < Rmax')
+    p.add_argument('--form-symmetry', type=int, default=None, help='with --catalog: only this symmetry')
+    p.add_argument('--max-coeff-err', type=float, default=None, help='with --catalog: only coeff_err below this')
+
+
+def input_files(args):
+    """
+    (R, Y, path) for the dumps chosen by the add_selection_args options: the
+    catalog query with --catalog (catalog.py and sqlite3 are only imported
+    then), else every dump under args.posts.
+    """
+    if not args.catalog:
+        return list(iter_coeff_files(args.posts))
+    import catalog
+    return catalog.select_coeff_files(args.catalog, Rmin=args.Rmin, Rmax=args.Rmax,
+                                      symmetry=args.form_symmetry, max_coeff_err=args.max_coeff_err)
+
+
+def derivative_labels(order):
+    """Column names for [L, L', L'', ...] up to `order`: L0, Lprime, Lpp, L3, ..."""
+    return (['L0', 'Lprime', 'Lpp'] + ['L%d' % k for k in range(3, order+1)])[:order+1]
+
+
+def adaptive_cut(a, smooth, tol=None, delta=None, order=0):
+    """
+    (a[:M_eff], M_eff, tail_bound) with M_eff the fewest coefficients for
+    which the neglected tail of every reported value (L and its derivatives
+    up to `order`, or the central difference with step `delta`) is provably
+    at most tol; see dirichlet_series.truncation. The tail of the central
+    difference is the series tail divided by delta. With tol None nothing is
+    cut, but the tail bound at M is still returned.
+    """
+    target = 0.0 if tol is None else tol
+    if delta is not None:
+        M_eff, tail = ds.truncation(len(a), (0.5-delta, 0.5, 0.5+delta), smooth, target*delta)
+        tail /= delta
+    else:
+        M_eff, tail = ds.truncation(len(a), (0.5,), smooth, target, log_power=order)
+    return a[:M_eff], M_eff, tail
+
+
+def process_posts_dir(posts_dir, delta, smooth, tol=None, files=None):
+    """
+    (R, Y, M, L0, L', M_eff, tail_bound, path) per dump, summing only the
+    first M_eff coefficients when tol is given (adaptive_cut). `files`
+    (R, Y, path) tuples, e.g. from a catalog query, replace the directory walk.
+    """
+    results = []
+    for R, Y, path in (iter_coeff_files(posts_dir) if files is None else files):
+        a = read_coeff_file(path)
+        if not len(a):
+            continue
+        s0 = 0.5
+        a_cut, M_eff, tail = adaptive_cut(a, smooth, tol, delta=delta)
+        Lm, L0, Lp = ds.L_values(a_cut, (s0-delta, s0, s0+delta), smooth)
+        deriv = (Lp - Lm) / (2.0*delta)
+        results.append((R, Y, len(a), L0, deriv, M_eff, tail, path))
+    return results
+
+
+def process_posts_dir_analytic(posts_dir, smooth, order=2, tol=None, files=None):
+    """
+    Like process_posts_dir, but returns (R, Y, M, derivs, M_eff, tail_bound,
+    path) where derivs holds [L(1/2), L'(1/2), ..., L^(order)(1/2)] from a
+    single series pass.
+    """
+    results = []
+    for R, Y, path in (iter_coeff_files(posts_dir) if files is None else files):
+        a = read_coeff_file(path)
+        if not len(a):
+            continue
+        a_cut, M_eff, tail = adaptive_cut(a, smooth, tol, order=order)
+        derivs = ds.L_derivatives(a_cut, 0.5, smooth, order=order)
+        results.append((R, Y, len(a), derivs, M_eff, tail, path))
     return results
 
 
+def _cut_note(M_eff, tail, tol):
+    # printed only in adaptive mode, so the default output is unchanged
+    if tol is None:
+        return ''
+    return ' M_eff=%d tail<=%.1e%s' % (M_eff, tail, '' if tail <= tol else ' NOT CONVERGED')
+
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument('--posts', default='outputs/scan_postprocess', help='postprocess outputs dir')
     p.add_argument('--delta', type=float, default=0.01, help='finite-difference delta')
     p.add_argument('--smooth', type=float, default=2000.0, help='smoothing parameter (exponential)')
+    p.add_argument('--method', choices=['fd', 'analytic', 'afe'], default='fd',
+                   help='fd: central difference in s; analytic: log-power weighted series (one pass, no delta); '
+                        'afe: approximate functional equation (see afe.py)')
+    p.add_argument('--order', type=int, default=2, help='highest derivative reported with --method analytic')
+    p.add_argument('--symmetry', type=int, default=-1, help='form parity for --method afe (-1 odd, +1 even)')
+    p.add_argument('--tol', type=float, default=None,
+                   help='absolute tolerance: sum only as many coefficients as needed (default 1e-8 for afe, '
+                        'all coefficients otherwise)')
+    add_selection_args(p)
+    p.add_argument('--startup-report', action='store_true', help='print per-module import times at exit')
     args = p.parse_args()
+    startup_report.mark_ready()
+    files = input_files(args)
+
+    if args.method == 'afe':
+        import afe
+        tol = 1e-8 if args.tol is None else args.tol
+        res = afe.process_posts_dir(args.posts, args.symmetry, tol=tol, files=files)
+        if not res:
+            print('No coefficient files found in', args.posts)
+            return
+        print('# R, Y, M, L(1/2), L\'(1/2), coefficients used, tail bound (AFE tol=%g)' % tol)
+        for R, Y, M, r, path in sorted(res, key=lambda r: (r[0], r[1])):
+            print('R=%.12f Y=%.3f M=%d L(1/2)=%+.6e L\'(1/2)=%+.6e N_used=%d tail<=%.1e  file=%s'
+                  % (R, Y, M, r['L0'], r['Lprime'], r['N_used'], r['tail_bound'], os.path.relpath(path)))
+        return
+
+    if args.method == 'analytic':
+        res = process_posts_dir_analytic(args.posts, args.smooth, order=args.order, tol=args.tol, files=files)
+        if not res:
+            print('No coefficient files found in', args.posts)
+            return
+        names = ['L(1/2)'] + ['L' + "'"*k + '(1/2)' if k <= 2 else 'L^(%d)(1/2)' % k for k in range(1, args.order+1)]
+        print('# R, Y, M, %s (analytic smooth=%g)' % (', '.join(names), args.smooth))
+        for R, Y, M, derivs, M_eff, tail, path in sorted(res, key=lambda r: (r[0], r[1])):
+            vals = ' '.join('%s=%+.6e' % (nm, v) for nm, v in zip(names, derivs))
+            print('R=%.12f Y=%.3f M=%d %s%s  file=%s' % (R, Y, M, vals, _cut_note(M_eff, tail, args.tol),
+                                                       os.path.relpath(path)))
+        return
 
-    res = process_posts_dir(args.posts, args.delta, args.smooth)
+    res = process_posts_dir(args.posts, args.delta, args.smooth, tol=args.tol, files=files)
     if not res:
         print('No coefficient files found in', args.posts)
         return
     print('# R, Y, M, L(1/2), L\'(1/2) (delta=%g smooth=%g)' % (args.delta, args.smooth))
-    for R, Y, M, L0, deriv, path in sorted(res):
-        print('R=%.12f Y=%.3f M=%d L(1/2)=%+.6e L\'(1/2)=%+.6e  file=%s' % (R, Y, M, L0, deriv, os.path.relpath(path)))
+    for R, Y, M, L0, deriv, M_eff, tail, path in sorted(res):
+        print('R=%.12f Y=%.3f M=%d L(1/2)=%+.6e L\'(1/2)=%+.6e%s  file=%s'
+              % (R, Y, M, L0, deriv, _cut_note(M_eff, tail, args.tol), os.path.relpath(path)))
 
 if __name__ == '__main__':
     main()
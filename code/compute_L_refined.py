@@ -2,13 +2,24 @@
 """
 Compute L(1/2) and finite-difference L'(1/2) for specific refined-R subdirectories.
 Writes outputs/scan_postprocess/L_derivatives_refined.csv
+
+With --method analytic the derivative columns are computed term by term from
+a single series pass (L, L', L'' ... up to --order) instead of a difference.
+
+Every row ends with M_eff and tail_bound: the number of coefficients summed
+and a bound on the neglected tail of each value (compute_L_derivative.adaptive_cut).
+With --tol the sum stops as soon as that bound is below the tolerance.
 """
+import startup_report
+startup_report.install_from_argv()
+
 import os
 import argparse
 import compute_L_derivative as cld
+import dirichlet_series as ds
 
 
-def process_dirs(dirs, outcsv, delta=0.01, smooth=2000.0):
+def process_dirs(dirs, outcsv, delta=0.01, smooth=2000.0, method='fd', order=2, tol=None):
     rows = []
     for d in dirs:
         if not os.path.isdir(d):
@@ -19,7 +30,7 @@ def process_dirs(dirs, outcsv, delta=0.01, smooth=2000.0):
                 continue
             path = os.path.join(d, fn)
             a = cld.read_coeff_file(path)
-            if not a:
+            if not len(a):
                 continue
             # extract R and Y from filename
             parts = fn.split('_')
@@ -29,17 +40,25 @@ def process_dirs(dirs, outcsv, delta=0.01, smooth=2000.0):
             except Exception:
                 R = float('nan')
                 Y = float('nan')
-            s0 = 0.5
-            Lp = cld.L_of_s(a, s0+delta, smooth)
-            Lm = cld.L_of_s(a, s0-delta, smooth)
-            L0 = cld.L_of_s(a, s0, smooth)
-            deriv = (Lp - Lm) / (2.0*delta)
-            rows.append((R, Y, len(a), L0, deriv, path))
+            if method == 'analytic':
+                a_cut, M_eff, tail = cld.adaptive_cut(a, smooth, tol, order=order)
+                vals = tuple(ds.L_derivatives(a_cut, 0.5, smooth, order=order))
+            else:
+                s0 = 0.5
+                a_cut, M_eff, tail = cld.adaptive_cut(a, smooth, tol, delta=delta)
+                Lm, L0, Lp = ds.L_values(a_cut, (s0-delta, s0, s0+delta), smooth)
+                vals = (L0, (Lp - Lm) / (2.0*delta))
+            rows.append((R, Y, len(a), vals, M_eff, tail, path))
     # write CSV-like output
     with open(outcsv, 'w') as f:
-        f.write('# R, Y, M, L(1/2), L\' (1/2) (delta=%g smooth=%g)\n' % (delta, smooth))
-        for R, Y, M, L0, deriv, path in sorted(rows):
-            f.write('%.12f,%.3f,%d,%.12e,%.12e,%s\n' % (R, Y, M, L0, deriv, path))
+        if method == 'analytic':
+            names = ['L(1/2)'] + ['L' + "\'"*k + ' (1/2)' if k <= 2 else 'L^(%d) (1/2)' % k for k in range(1, order+1)]
+            f.write('# R, Y, M, %s, M_eff, tail_bound (analytic smooth=%g)\n' % (', '.join(names), smooth))
+        else:
+            f.write('# R, Y, M, L(1/2), L\' (1/2), M_eff, tail_bound (delta=%g smooth=%g)\n' % (delta, smooth))
+        for R, Y, M, vals, M_eff, tail, path in sorted(rows, key=lambda r: (r[0], r[1], r[6])):
+            f.write('%.12f,%.3f,%d,%s,%d,%.3e,%s\n' % (R, Y, M, ','.join('%.12e' % v for v in vals),
+                                                     M_eff, tail, path))
     print('Wrote', outcsv)
 
 
@@ -49,8 +68,14 @@ def main():
     p.add_argument('--out', default='outputs/scan_postprocess/L_derivatives_refined.csv')
     p.add_argument('--delta', type=float, default=0.01)
     p.add_argument('--smooth', type=float, default=2000.0)
+    p.add_argument('--method', choices=['fd', 'analytic'], default='fd')
+    p.add_argument('--order', type=int, default=2, help='highest derivative written with --method analytic')
+    p.add_argument('--tol', type=float, default=None, help='stop summing once the tail bound is below this')
+    p.add_argument('--startup-report', action='store_true', help='print per-module import times at exit')
     args = p.parse_args()
-    process_dirs(args.dirs, args.out, delta=args.delta, smooth=args.smooth)
+    startup_report.mark_ready()
+    process_dirs(args.dirs, args.out, delta=args.delta, smooth=args.smooth,
+                 method=args.method, order=args.order, tol=args.tol)
 
 if __name__ == '__main__':
     main()
@@ -2,7 +2,12 @@
 """
 compute_L_stats.py
 Postprocess coefficient dumps to compute L(1/2) and finite-difference L'(1/2) across forms,
-produce a small CSV and plots (requires matplotlib + numpy).
+produce a small CSV and plots (matplotlib is imported only for the plots;
+--no-plots skips them).
+With --method analytic, L'(1/2) (and L''(1/2) ... up to --order) is computed
+term by term in the same pass as L(1/2); the extra columns go into the CSV.
+M_eff and tail_bound record how many coefficients were summed and a bound on
+the neglected tail; --tol stops the sum once that bound is met.
 
 Run inside the Sage container (it has matplotlib available):
   sage -python compute_L_stats.py --posts outputs/scan_postprocess --delta 0.01 --smooth 2000
@@ -12,48 +17,15 @@ Outputs:
   outputs/scan_postprocess/plots/Lprime_hist.png
   outputs/scan_postprocess/plots/Lprime_vs_R.png
 """
+import startup_report
+startup_report.install_from_argv()
+
 import os
-import math
 import argparse
 import csv
 
-try:
-    import matplotlib
-    matplotlib.use('Agg')
-    import matplotlib.pyplot as plt
-    import numpy as np
-except Exception:
-    plt = None
-    np = None
-
-
-def chi3(n):
-    r = n % 3
-    return 0 if r == 0 else (1 if r == 1 else -1)
-
-
-def read_coeff_file(path):
-    a = []
-    with open(path,'r') as f:
-        for line in f:
-            if not line.strip():
-                continue
-            i, val = line.split()[:2]
-            try:
-                a.append(float(val))
-            except:
-                pass
-    return a
-
-
-def L_of_s(a, s, smooth):
-    tot = 0.0
-    for n, an in enumerate(a, start=1):
-        c = chi3(n)
-        if c == 0:
-            continue
-        tot += an * c * (n**(-s)) * math.exp(-n/float(smooth))
-    return tot
+import compute_L_derivative as cld
+import dirichlet_series as ds
 
 
 def find_coeff_files(posts_dir):
@@ -85,34 +57,54 @@ def main():
     p.add_argument('--posts', default='outputs/scan_postprocess', help='postprocess outputs dir')
     p.add_argument('--delta', type=float, default=0.01)
     p.add_argument('--smooth', type=float, default=2000.0)
+    p.add_argument('--method', choices=['fd','analytic'], default='fd', help='finite difference or single-pass log-power weights')
+    p.add_argument('--order', type=int, default=2, help='highest derivative written with --method analytic')
+    p.add_argument('--tol', type=float, default=None, help='stop summing once the tail bound is below this')
     p.add_argument('--dpi', type=int, default=300, help='DPI for output plots')
     p.add_argument('--outfmt', choices=['png','pdf','both'], default='both', help='Output format for plots')
+    p.add_argument('--no-plots', action='store_true', help='only write the CSV (matplotlib is not imported)')
+    cld.add_selection_args(p)
+    p.add_argument('--startup-report', action='store_true', help='print per-module import times at exit')
     args = p.parse_args()
+    startup_report.mark_ready()
 
-    coeff_files = find_coeff_files(args.posts)
+    if args.catalog:
+        coeff_files = cld.input_files(args)
+    else:
+        coeff_files = [parse_filename(path) + (path,) for path in find_coeff_files(args.posts)]
     if not coeff_files:
-        print('No coeff files found in', args.posts)
+        print('No coeff files found in', args.catalog or args.posts)
         return
+    labels = cld.derivative_labels(args.order) if args.method == 'analytic' else ['L0','Lprime']
     rows = []
-    for path in coeff_files:
-        a = read_coeff_file(path)
-        if not a:
+    for R, Y, path in coeff_files:
+        a = cld.read_coeff_file(path)
+        if not len(a):
             continue
-        R, Y = parse_filename(path)
-        Lp = L_of_s(a, 0.5+args.delta, args.smooth)
-        Lm = L_of_s(a, 0.5-args.delta, args.smooth)
-        L0 = L_of_s(a, 0.5, args.smooth)
-        deriv = (Lp - Lm) / (2.0*args.delta)
-        rows.append({'R':R,'Y':Y,'M':len(a),'L0':L0,'Lprime':deriv,'file':os.path.relpath(path)})
+        row = {'R':R,'Y':Y,'M':len(a),'file':os.path.relpath(path)}
+        if args.method == 'analytic':
+            a, M_eff, tail = cld.adaptive_cut(a, args.smooth, args.tol, order=args.order)
+            derivs = ds.L_derivatives(a, 0.5, args.smooth, order=args.order)
+            row.update(zip(labels, derivs))
+        else:
+            a, M_eff, tail = cld.adaptive_cut(a, args.smooth, args.tol, delta=args.delta)
+            Lm, L0, Lp = ds.L_values(a, (0.5-args.delta, 0.5, 0.5+args.delta), args.smooth)
+            deriv = (Lp - Lm) / (2.0*args.delta)
+            row.update({'L0':L0,'Lprime':deriv})
+        row.update({'M_eff':M_eff,'tail_bound':'%.3e' % tail})
+        rows.append(row)
 
     outcsv = os.path.join(args.posts, 'L_derivatives.csv')
     with open(outcsv, 'w', newline='') as f:
-        w = csv.DictWriter(f, fieldnames=['R','Y','M','L0','Lprime','file'])
+        w = csv.DictWriter(f, fieldnames=['R','Y','M']+labels+['M_eff','tail_bound','file'])
         w.writeheader()
         for r in sorted(rows, key=lambda x:(x['R'], x['Y'])):
             w.writerow(r)
     print('Wrote', outcsv)
 
+    if args.no_plots:
+        return
+    plt = startup_report.pyplot()
     if plt is None:
         print('matplotlib not available: skipping plots')
         return
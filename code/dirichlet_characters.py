@@ -0,0 +1,329 @@
+#!/usr/bin/env python3
+"""
+dirichlet_characters.py
+Dirichlet characters mod q as complex tables, and the twisted sums of a
+form by a whole family of characters at once.
+
+For q = prod p^k the group (Z/q)^x is the product of the (Z/p^k)^x (CRT).
+Each factor is cyclic with a generator g found by search, except for 2^k,
+k >= 3, which is <-1> x <5>; a character of a factor is fixed by its values
+on the generators, and the characters mod q are all products of one
+character per factor. character_table(q) holds them as rows chi[j, n mod q]
+(0 at n not prime to q). chi is primitive iff for no p | q it is trivial
+on the units n = 1 mod q/p, i.e. iff conductor(chi) = q.
+
+A CharacterFamily stacks characters of several moduli into one matrix
+X[chi, n], so for a coefficient array a (or a stack of forms)
+
+  L(s, f x chi)   ~ sum_n a_n chi(n) n^{-s} exp(-n/SMOOTH),
+  L^(k)(s, f x chi) ~ sum_n a_n chi(n) (-log n)^k n^{-s} exp(-n/SMOOTH),
+  S_f(X; chi)    = sum_p a_p chi(p) exp(-p/X)
+
+are each a product of the weighted coefficients with X^T, accumulated
+over blocks of n (or X) sized to a memory budget, max_mem_mb. The
+chi3 used everywhere else is the real character mod 3 (chi3 below).
+
+Usage (run from code/):
+  python3 dirichlet_characters.py --posts outputs/scan_postprocess --qmax 30
+  python3 dirichlet_characters.py --posts outputs/scan_postprocess --moduli 3 4 5 7 --X 500 1000 2000 5000
+"""
+import os
+import csv
+import math
+import argparse
+from functools import lru_cache
+
+import numpy as np
+
+import prime_sums
+
+CHI3 = np.array([0.0, 1.0, -1.0])
+FIELDS = ['R', 'Y', 'M', 'q', 'index', 'parity', 'real', 'L0_re', 'L0_im', 'Lprime_re', 'Lprime_im', 'file']
+S_FIELDS = ['R', 'Y', 'M', 'q', 'index', 'X', 'S_re', 'S_im', 'file']
+
+
+def chi3(n):
+    """The real character mod 3 at n (an int or an integer array)."""
+    return CHI3[np.asarray(n) % 3]
+
+
+@lru_cache(maxsize=None)
+def factor(q):
+    """[(p, k), ...] with q = prod p^k, p increasing."""
+    out = []
+    p = 2
+    while p*p <= q:
+        if q % p == 0:
+            k = 0
+            while q % p == 0:
+                q //= p
+                k += 1
+            out.append((p, k))
+        p += 1
+    if q > 1:
+        out.append((q, 1))
+    return out
+
+
+def _cyclic_generator(m, phi):
+    # smallest g whose powers run through all phi units mod m
+    for g in range(2, m + 1):
+        if math.gcd(g, m) != 1:
+            continue
+        x, order = g % m, 1
+        while x != 1 % m:
+            x = x*g % m
+            order += 1
+        if order == phi:
+            return g
+    return 1
+
+
+def _snap(t):
+    # exact zeros and +-1 for the values the exponentials only get to 1e-16
+    re, im = t.real.copy(), t.imag.copy()
+    for part in (re, im):
+        part[np.abs(part) < 1e-12] = 0.0
+        part[np.abs(np.abs(part) - 1.0) < 1e-12] = np.sign(part[np.abs(np.abs(part) - 1.0) < 1e-12])
+    return re + 1j*im
+
+
+@lru_cache(maxsize=None)
+def _local_table(p, k):
+    """Characters mod p^k as rows of a (phi(p^k), p^k) complex array."""
+    m = p**k
+    phi = m - m//p
+    if p == 2 and k >= 3:
+        # n = (-1)^e1 5^e2 mod 2^k
+        h = phi // 2
+        e1 = np.zeros(m, dtype=np.int64)
+        e2 = np.zeros(m, dtype=np.int64)
+        x = 1
+        for e in range(h):
+            e2[x], e2[m - x] = e, e
+            e1[m - x] = 1
+            x = x*5 % m
+        j1, j2 = np.divmod(np.arange(phi), h)
+        t = np.exp(2j*math.pi*(np.outer(j1, e1)/2.0 + np.outer(j2, e2)/h))
+    else:
+        g = _cyclic_generator(m, phi)
+        log = np.zeros(m, dtype=np.int64)
+        x = 1 % m
+        for e in range(phi):
+            log[x] = e
+            x = x*g % m
+        t = np.exp(2j*math.pi*np.outer(np.arange(phi), log)/phi)
+    units = np.gcd(np.arange(m), m) == 1
+    t[:, ~units] = 0.0
+    return _snap(t)
+
+
+@lru_cache(maxsize=64)
+def character_table(q):
+    """All phi(q) characters mod q as rows chi[j, n mod q] of a read-only complex array (row 0 is principal)."""
+    n = np.arange(q)
+    t = np.ones((1, q), dtype=np.complex128)
+    for p, k in factor(q):
+        loc = _local_table(p, k)
+        t = (t[:, None, :] * loc[None, :, n % p**k]).reshape(-1, q)
+    t.flags.writeable = False
+    return t
+
+
+def conductor(row, q):
+    """Conductor of the character mod q with table row `row`."""
+    n = np.arange(q)
+    units = np.gcd(n, q) == 1
+    f = q
+    changed = True
+    while changed:
+        changed = False
+        for p, _ in factor(f):
+            d = f // p
+            sel = units & (n % d == 1 % d)
+            if np.allclose(row[sel], 1.0):
+                f = d
+                changed = True
+                break
+    return f
+
+
+@lru_cache(maxsize=64)
+def primitive_indices(q):
+    """Row indices of the primitive characters in character_table(q)."""
+    t = character_table(q)
+    return tuple(j for j in range(t.shape[0]) if conductor(t[j], q) == q)
+
+
+class CharacterFamily(object):
+    """
+    A list of characters (q, index into character_table(q)) evaluated as one
+    matrix. labels holds a dict per character: q, index, parity (chi(-1)),
+    real and order.
+    """
+
+    def __init__(self, chars):
+        self.chars = [(int(q), int(j)) for q, j in chars]
+        self.labels = []
+        for q, j in self.chars:
+            row = character_table(q)[j]
+            vals = row[np.gcd(np.arange(q), q) == 1]
+            order = 1
+            while not np.allclose(vals**order, 1.0):
+                order += 1
+            self.labels.append({'q': q, 'index': j, 'parity': int(round(row[(q - 1) % q].real)),
+                                'real': bool(np.allclose(row.imag, 0.0)), 'order': order})
+        self._cache = {}
+
+    @classmethod
+    def primitive(cls, moduli, real_only=False):
+        """All primitive characters of the given moduli (optionally only the real ones)."""
+        chars = [(q, j) for q in moduli for j in primitive_indices(q)]
+        fam = cls(chars)
+        if real_only:
+            fam = cls([c for c, lab in zip(fam.chars, fam.labels) if lab['real']])
+        return fam
+
+    def __len__(self):
+        return len(self.chars)
+
+    def values(self, n):
+        """chi(n) for every character (rows) at the integers n (columns)."""
+        n = np.asarray(n, dtype=np.int64)
+        out = np.empty((len(self.chars), n.size), dtype=np.complex128)
+        for i, (q, j) in enumerate(self.chars):
+            out[i] = character_table(q)[j, n % q]
+        return out
+
+    def matrix(self, M):
+        """values(1..M), cached per M."""
+        if M not in self._cache:
+            X = self.values(np.arange(1, M + 1))
+            X.flags.writeable = False
+            self._cache = {M: X}
+        return self._cache[M]
+
+
+def _n_block(fam, a, width, max_mem_mb):
+    # n values per block so that the character values (complex), the weights
+    # and the weighted coefficients of every form stay within max_mem_mb
+    rows = int(np.prod(a.shape[:-1], dtype=np.int64))
+    per_n = 16*len(fam) + 8*width*(1 + rows)
+    return max(1, int(max_mem_mb * 2**20 // per_n))
+
+
+def L_family(a, fam, s_values, smooth, max_mem_mb=prime_sums.MAX_MEM_MB):
+    """
+    Smoothed L(s, f x chi) for every character of `fam` and every s, shape
+    a.shape[:-1] + (len(fam), len(s_values)); `a` is a[0]=a1 or a stack of
+    zero-padded forms. The sum runs over blocks of n sized to max_mem_mb.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    s = np.atleast_1d(np.asarray(s_values, dtype=np.float64))
+    M = a.shape[-1]
+    out = np.zeros(a.shape[:-1] + (s.size, len(fam)), dtype=np.complex128)
+    B = _n_block(fam, a, s.size, max_mem_mb)
+    for lo in range(0, M, B):
+        n = np.arange(lo + 1, min(M, lo + B) + 1, dtype=np.float64)
+        w = np.exp(-np.outer(s, np.log(n)) - n/float(smooth))
+        c = a[..., None, lo:lo + n.size] * w
+        out += c @ fam.values(n.astype(np.int64)).T
+    return np.swapaxes(out, -1, -2)
+
+
+def L_derivatives_family(a, fam, s, smooth, order=1, max_mem_mb=prime_sums.MAX_MEM_MB):
+    """
+    [L, L', ..., L^(order)](s, f x chi) for every character of `fam`, shape
+    a.shape[:-1] + (len(fam), order+1), from one log-power weighted pass over
+    blocks of n sized to max_mem_mb.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    M = a.shape[-1]
+    out = np.zeros(a.shape[:-1] + (order + 1, len(fam)), dtype=np.complex128)
+    B = _n_block(fam, a, order + 1, max_mem_mb)
+    for lo in range(0, M, B):
+        n = np.arange(lo + 1, min(M, lo + B) + 1, dtype=np.float64)
+        logn = np.log(n)
+        powers = np.power.outer(-logn, np.arange(order + 1)).T
+        c = a[..., None, lo:lo + n.size] * (powers * np.exp(-s*logn - n/float(smooth)))
+        out += c @ fam.values(n.astype(np.int64)).T
+    return np.swapaxes(out, -1, -2)
+
+
+def S_f_family(a, fam, Xs, block=None, max_mem_mb=prime_sums.MAX_MEM_MB):
+    """
+    S_f(X; chi) = sum_{p <= M} a_p chi(p) exp(-p/X) for every character of
+    `fam` and X in `Xs`, shape a.shape[:-1] + (len(fam), len(Xs)). X is
+    processed in blocks whose kernel fits in max_mem_mb (prime_sums.S_f).
+    """
+    a = np.asarray(a, dtype=np.float64)
+    X = np.atleast_1d(np.asarray(Xs, dtype=np.float64))
+    pint = prime_sums.primes_upto(a.shape[-1])
+    p = pint.astype(np.float64)
+    c = a[..., None, pint - 1] * fam.values(pint)
+    out = np.empty(a.shape[:-1] + (len(fam), X.size), dtype=np.complex128)
+    if block is None:
+        block = prime_sums.kernel_block(p.size, max_mem_mb)
+    buf = np.empty((min(block, X.size), p.size))
+    for i in range(0, X.size, block):
+        x = X[i:i+block]
+        K = buf[:x.size]
+        np.multiply.outer(-1.0/x, p, out=K)
+        np.exp(K, out=K)
+        out[..., i:i+block] = c @ K.T
+    return out
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--posts', default='outputs/scan_postprocess', help='postprocess outputs dir')
+    p.add_argument('--moduli', type=int, nargs='+', default=None, help='moduli to use (default: 3..--qmax)')
+    p.add_argument('--qmax', type=int, default=30, help='largest modulus when --moduli is not given')
+    p.add_argument('--real', action='store_true', help='only real (quadratic) characters')
+    p.add_argument('--smooth', type=float, default=2000.0, help='smoothing parameter (exponential)')
+    p.add_argument('--X', type=float, nargs='*', default=[], help='also write S_f(X; chi) at these X')
+    p.add_argument('--out', default=None, help='output CSV (default: <posts>/L_twists.csv)')
+    p.add_argument('--max-mem-mb', type=float, default=prime_sums.MAX_MEM_MB,
+                   help='memory budget for one block of the twisted sums')
+    args = p.parse_args()
+
+    import compute_L_derivative as cld
+    moduli = args.moduli or range(3, args.qmax + 1)
+    fam = CharacterFamily.primitive(moduli, real_only=args.real)
+    print('%d primitive characters, moduli %s' % (len(fam), ' '.join(str(q) for q in sorted(set(moduli)))))
+    rows, srows = [], []
+    for R, Y, path in cld.iter_coeff_files(args.posts):
+        a = cld.read_coeff_file(path)
+        if not len(a):
+            continue
+        L = L_derivatives_family(a, fam, 0.5, args.smooth, order=1, max_mem_mb=args.max_mem_mb)
+        for lab, (L0, Lp) in zip(fam.labels, L):
+            rows.append({'R': f'{R:.12f}', 'Y': f'{Y:.3f}', 'M': len(a), 'q': lab['q'], 'index': lab['index'],
+                         'parity': lab['parity'], 'real': int(lab['real']),
+                         'L0_re': f'{L0.real:.12e}', 'L0_im': f'{L0.imag:.12e}',
+                         'Lprime_re': f'{Lp.real:.12e}', 'Lprime_im': f'{Lp.imag:.12e}', 'file': path})
+        if args.X:
+            S = S_f_family(a, fam, args.X, max_mem_mb=args.max_mem_mb)
+            for lab, Sc in zip(fam.labels, S):
+                for X, s in zip(args.X, Sc):
+                    srows.append({'R': f'{R:.12f}', 'Y': f'{Y:.3f}', 'M': len(a), 'q': lab['q'],
+                                  'index': lab['index'], 'X': f'{X:g}', 'S_re': f'{s.real:+.6f}',
+                                  'S_im': f'{s.imag:+.6f}', 'file': path})
+        print(f'R={R:.12f} Y={Y:.3f} M={len(a)}: {len(fam)} twists')
+    outcsv = args.out or os.path.join(args.posts, 'L_twists.csv')
+    with open(outcsv, 'w', newline='') as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        w.writerows(rows)
+    print('Wrote', outcsv)
+    if args.X:
+        scsv = os.path.join(os.path.dirname(outcsv), 'S_f_twists.csv')
+        with open(scsv, 'w', newline='') as f:
+            w = csv.DictWriter(f, fieldnames=S_FIELDS)
+            w.writeheader()
+            w.writerows(srows)
+        print('Wrote', scsv)
+
+
+if __name__ == '__main__':
+    main()
@@ -0,0 +1,128 @@
+"""
+dirichlet_series.py
+Batched evaluation of the smoothed truncated Dirichlet series for f x chi3
+
+  L(s) ≈ sum_{n=1..M} a_n * chi3(n) * n^{-s} * exp(-n/SMOOTH)
+
+for a whole vector of s values and smoothing parameters in one pass.
+
+The per-M tables (the indices n with chi3(n) != 0, log n and chi3(n)) are
+built once and cached, so repeated evaluations on coefficient arrays of the
+same length only pay for the exponentials and one matrix product. Twists by
+other characters, many at once, are in dirichlet_characters.py.
+
+truncation() gives the adaptive cut: with |a_n| <= d(n) n^{7/64}
+(coeff_bounds.py) it finds the smallest M_eff for which everything past
+M_eff, including the n > M missing from the data, is provably below a
+requested tolerance.
+"""
+import math
+from functools import lru_cache
+
+import numpy as np
+
+import coeff_bounds
+import dirichlet_characters as dc
+
+
+@lru_cache(maxsize=32)
+def series_tables(M):
+    """
+    Return (idx, n, logn, chi) for 1 <= n <= M restricted to chi3(n) != 0.
+
+    idx are the 0-based positions into a coefficient array a[0]=a1, n and
+    logn are float64 copies of n and log(n), chi holds the values +-1.
+    The arrays are shared between callers and marked read-only.
+    """
+    nint = np.arange(1, M+1, dtype=np.int64)
+    chi = dc.chi3(nint)
+    keep = chi != 0
+    nint = nint[keep]
+    chi = chi[keep]
+    idx = nint - 1
+    n = nint.astype(np.float64)
+    logn = np.log(n)
+    for arr in (idx, n, logn, chi):
+        arr.flags.writeable = False
+    return idx, n, logn, chi
+
+
+def L_grid(a, s_values, smooths):
+    """
+    Evaluate the smoothed series for every s in `s_values` and every smoothing
+    parameter in `smooths`.
+
+    `a` is a sequence with a[0]=a1. Returns a float64 array of shape
+    (len(smooths), len(s_values)).
+    """
+    a = np.asarray(a, dtype=np.float64)
+    s = np.atleast_1d(np.asarray(s_values, dtype=np.float64))
+    sm = np.atleast_1d(np.asarray(smooths, dtype=np.float64))
+    idx, n, logn, chi = series_tables(a.size)
+    c = a[idx] * chi
+    power = np.exp(-np.outer(s, logn))
+    damp = np.exp(-np.outer(1.0/sm, n))
+    return (damp * c) @ power.T
+
+
+def L_values(a, s_values, smooth):
+    """Evaluate the smoothed series at each s in `s_values` for one `smooth`."""
+    return L_grid(a, s_values, (smooth,))[0]
+
+
+def L_derivatives(a, s, smooth, order=2):
+    """
+    Return [L(s), L'(s), ..., L^(order)(s)] of the smoothed series in one pass.
+
+    Differentiating term by term gives
+
+      L^(k)(s) = sum_n a_n * chi3(n) * (-log n)^k * n^{-s} * exp(-n/SMOOTH)
+
+    so every derivative reuses the same weighted terms, multiplied by a power
+    of -log n. Unlike the central difference there is no delta-dependent
+    truncation error.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    idx, n, logn, chi = series_tables(a.size)
+    terms = a[idx] * chi * np.exp(-s*logn - n/float(smooth))
+    powers = np.power.outer(-logn, np.arange(order+1)).T
+    return powers @ terms
+
+
+def series_weights(M, s_values, smooth):
+    """
+    Dense weights chi3(n) * n^{-s} * exp(-n/SMOOTH) for n = 1..M, one row per s.
+
+    Entries with chi3(n) = 0 are zero, so for a (forms x M) coefficient matrix
+    A the smoothed series of every form is the single product A @ W.T.
+    """
+    s = np.atleast_1d(np.asarray(s_values, dtype=np.float64))
+    idx, n, logn, chi = series_tables(M)
+    W = np.zeros((s.size, M))
+    W[:, idx] = chi * np.exp(-np.outer(s, logn) - n/float(smooth))
+    return W
+
+
+def truncation(M, s_values, smooth, tol, theta=coeff_bounds.KIM_SARNAK, log_power=0):
+    """
+    (M_eff, tail_bound): the smallest M_eff <= M such that
+
+      sum_{n > M_eff} |a_n chi3(n) (log n)^k n^{-s} exp(-n/SMOOTH)| <= tail_bound <= tol
+
+    for every s in `s_values` and 0 <= k <= log_power, under
+    |a_n| <= d(n) n^theta. If even the full M does not reach tol, M_eff = M
+    and tail_bound is the (larger) bound at M.
+    """
+    sigma = float(np.min(s_values))
+    smooth = float(smooth)
+    # past the table (log n)^k <= (k/(e*eps))^k n^eps and d(n) <= 2 sqrt(n)
+    eps = 0.1 if log_power else 0.0
+    const = 2.0 * max(1.0, (log_power/(math.e*eps))**log_power) if log_power else 2.0
+    alpha = 0.5 + theta - sigma + eps
+    T = coeff_bounds.table_length(M, alpha, smooth)
+    idx, n, logn, chi = series_tables(T)
+    terms = np.zeros(T)
+    terms[idx] = (coeff_bounds.coeff_bound(T, theta)[idx] * np.maximum(1.0, logn**log_power)
+                  * np.exp(-sigma*logn - n/smooth))
+    tail = coeff_bounds.tail_bounds(terms, alpha, smooth, const)
+    return coeff_bounds.truncation_point(tail, M, tol)
@@ -0,0 +1,76 @@
+"""
+driver_events.py
+JSON-lines event stream for the eigenvalue search drivers (--jsonl mode).
+
+find_single_ev_linearized accepts a `callback(event, **fields)`; JsonlEmitter
+is that callback and writes one JSON object per line. Every event carries
+`event` and a unix timestamp `t`:
+
+  search          R, radius, symmetry[, level]   start of a search window
+  step            R, radius, remaining           one linearized refinement step
+  near_candidate  R                              radius fell below the error bound
+  check           R, passed, coeff_err[, signs]  coefficient-difference check
+  eigenvalue      R, search_R, radius[, level], coeff_err[, signs]
+                                                 final refined eigenvalue
+  none            search_R, radius[, level]      nothing found in the window
+
+The final events repeat the window of the last search event (its R as
+search_R, radius and level), so a consumer needs no join to know where an
+eigenvalue was found.
+
+read_events and candidate_from_events are the matching reader used by
+postprocess_scan_results.
+"""
+import sys
+import json
+import time
+
+
+class JsonlEmitter(object):
+
+    def __init__(self, stream=None):
+        self.stream = stream if stream is not None else sys.stdout
+        self.last_check = {}
+        self.window = {}
+
+    def __call__(self, event, **fields):
+        rec = {'event': event, 't': time.time()}
+        rec.update(fields)
+        self.stream.write(json.dumps(rec) + '\n')
+        self.stream.flush()
+        if event == 'check' and fields.get('passed'):
+            self.last_check = fields
+        elif event == 'search':
+            self.window = dict(('search_R' if k == 'R' else k, v) for k, v in fields.items()
+                               if k in ('R', 'radius', 'level'))
+
+    def finish(self, R):
+        """Emit the final event for a window: the eigenvalue R, or none if R is None."""
+        if R is None:
+            self('none', **self.window)
+        else:
+            extra = dict((k, v) for k, v in self.last_check.items() if k in ('coeff_err', 'signs'))
+            extra.update(self.window)
+            self('eigenvalue', R=float(R), **extra)
+
+
+def read_events(path):
+    """Yield the events of a .jsonl log one line at a time, skipping a torn last line."""
+    with open(path, 'r', errors='ignore') as f:
+        for line in f:
+            line = line.strip()
+            if not line:
+                continue
+            try:
+                yield json.loads(line)
+            except ValueError:
+                continue
+
+
+def candidate_from_events(events):
+    """(R, coeff_err) of the last eigenvalue event in `events`, or None."""
+    cand = None
+    for ev in events:
+        if ev.get('event') == 'eigenvalue':
+            cand = (float(ev['R']), float(ev.get('coeff_err', float('inf'))))
+    return cand
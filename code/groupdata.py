@@ -14,6 +14,7 @@ keys and values:
     level      : Integer level
     Udata      : Udict (see below)
     Cdata      : Cdict (see below)
+    version    : GROUPDATA_VERSION the data was computed with
 
 The two subdictionaries Udata and Cdata store data associated to the parabolic
 vertices and cusps. The format of these dictionaries is the same except for the
@@ -43,13 +44,39 @@ keys.
     Note: the structure of Cdict is to mirror Udict, even though much of the
     data is redundant.
 
-"""
 
+    ### Caching ###
+
+group_data(N) is computed once per level and process and kept in memory.
+It is also pickled to $MAASS_GROUPDATA_CACHE/groupdata_N{N}_v{VERSION}.pkl
+(default code/cache/groupdata), so later processes load it instead of
+rebuilding it. Bump GROUPDATA_VERSION whenever the contents change; stale
+files are then simply not found. The returned dictionary is shared between
+callers and must not be modified (the solver only reads it).
+
+The parabolic vertices of the fundamental domain are the images gamma(oo)
+= a/c of the coset reps (the images of the elliptic corners are never
+real), so they are taken as exact rationals instead of from gamma.acton on
+the symbolic corners, and the Farey symbol is built once per level.
+
+"""
 
 # This file was *autogenerated* from the file groupdata.sage
 from sage.all_cmdline import *   # import sage library
 
-_sage_const_16 = Integer(16); _sage_const_0 = Integer(0); _sage_const_2 = Integer(2); _sage_const_1 = Integer(1); _sage_const_3 = Integer(3)
+_sage_const_1 = Integer(1); _sage_const_16 = Integer(16); _sage_const_0 = Integer(0); _sage_const_2 = Integer(2)
+
+import os
+import pickle
+import tempfile
+
+GROUPDATA_VERSION = _sage_const_1 
+
+DEFAULT_ROOT = os.environ.get('MAASS_GROUPDATA_CACHE',
+                              os.path.join(os.path.dirname(os.path.abspath(__file__)), 'cache', 'groupdata'))
+
+_memo = dict()
+
 def check_level(N):
     """
     Checks that N = 2^r p_1 ... p_n, r <= 3 and p_j distinct, odd.
@@ -61,31 +88,82 @@ def check_level(N):
     return True
 
 
-def group_data(N):
+def cache_path(N, root=DEFAULT_ROOT):
+    return os.path.join(root, 'groupdata_N{}_v{}.pkl'.format(int(N), GROUPDATA_VERSION))
+
+
+def load_group_data(N, root=DEFAULT_ROOT):
+    """
+    Returns the cached group data for level N, or None if there is no
+    usable cache file.
+    """
+    try:
+        with open(cache_path(N, root), 'rb') as f:
+            data = pickle.load(f)
+    except (OSError, EOFError, pickle.UnpicklingError, AttributeError, ImportError):
+        return None
+    if data.get('version') != GROUPDATA_VERSION or data.get('level') != N:
+        return None
+    return data
+
+
+def save_group_data(data, root=DEFAULT_ROOT):
+    """
+    Writes `data` to the cache atomically (temporary file renamed into
+    place). Failures are ignored: the cache is only an optimization.
+    """
+    try:
+        os.makedirs(root, exist_ok=True)
+        fd, tmp = tempfile.mkstemp(dir=root, suffix='.tmp')
+        with os.fdopen(fd, 'wb') as f:
+            pickle.dump(data, f, protocol=pickle.HIGHEST_PROTOCOL)
+        os.replace(tmp, cache_path(data['level'], root))
+    except OSError:
+        pass
+
+
+def group_data(N, use_cache=True):
     """
     Computes necessary data associated to the group Gamma0(N).
 
+    The result is memoized per level and read from (or written to) the disk
+    cache unless use_cache is False.
+
     See the module description for groupdata for more.
     """
     check_level(N)
+    N = Integer(N)
+    if N in _memo:
+        return _memo[N]
+    data = load_group_data(N) if use_cache else None
+    if data is None:
+        data = compute_group_data(N)
+        if use_cache:
+            save_group_data(data)
+    _memo[N] = data
+    return data
+
+
+def _immutable(m):
+    m.set_immutable()
+    return m
+
+
+def compute_group_data(N):
+    """
+    Computes the group_data(N) dictionary from scratch.
+    """
+    check_level(N)
     congruence_subgroup = Gamma0(N)
-    initial_vertices = [
-        -_sage_const_1 /_sage_const_2  + sqrt(_sage_const_3 )/_sage_const_2  * i,
-        _sage_const_1 /_sage_const_2   + sqrt(_sage_const_3 )/_sage_const_2  * i,
-        infinity
-    ]
-    vertices = set()
+    farey = congruence_subgroup.farey_symbol()
     coset_reps = list(congruence_subgroup.coset_reps())
-    # coset_reps = list(congruence_subgroup.farey_symbol().coset_reps())
-    for gamma in coset_reps:
-        for vertex in initial_vertices:
-            vertices.add(gamma.acton(vertex))
+    # coset_reps = list(farey.coset_reps())
 
     parabolic_vertices = set() # All parabolic vertices in fundamental domain, possibly
                                # with multiple corresponding to the same cusp.
-    for vertex in vertices:
-        if imag(vertex) == _sage_const_0 :
-            parabolic_vertices.add(vertex)
+    for gamma in coset_reps:
+        a, c = gamma.matrix()[_sage_const_0 , _sage_const_0 ], gamma.matrix()[_sage_const_1 , _sage_const_0 ]
+        parabolic_vertices.add(infinity if c == _sage_const_0  else QQ(a) / QQ(c))
 
     # reorder so that infinity is always the first cusp
     cusps = [infinity] + [QQ(cusp) for cusp in congruence_subgroup.cusps() if cusp != infinity]
@@ -105,8 +183,8 @@ def group_data(N):
     for pvertex in parabolic_vertices:
         # (cusp, U_ell, sigma_ell)
         if pvertex == infinity:
-            U_ell = matrix([[_sage_const_1 , _sage_const_0 ], [_sage_const_0 , _sage_const_1 ]])
-            sigma = matrix([[_sage_const_1 , _sage_const_0 ], [_sage_const_0 , _sage_const_1 ]])
+            U_ell = _immutable(matrix([[_sage_const_1 , _sage_const_0 ], [_sage_const_0 , _sage_const_1 ]]))
+            sigma = _immutable(matrix([[_sage_const_1 , _sage_const_0 ], [_sage_const_0 , _sage_const_1 ]]))
             Cdata = (infinity, infinity, U_ell, sigma)
             Cdict[infinity] = Cdata
             Udata = (infinity, infinity, U_ell, sigma)
@@ -115,7 +193,7 @@ def group_data(N):
             # This numerology is a pain. I briefly describe this on pg 45
             # of my notes, though it may be just as fast to directly compare
             # to Atkin-Lehner--Li.
-            U_ell = congruence_subgroup.farey_symbol().reduce_to_cusp(pvertex)
+            U_ell = farey.reduce_to_cusp(pvertex)
             c = congruence_subgroup.reduce_cusp(pvertex)
             numer = c.numerator()
             denom = c.denominator()
@@ -125,14 +203,14 @@ def group_data(N):
             assert g == _sage_const_1 
             sigma = matrix([[numer, t], [denom, s*width]])
             scaling = matrix([[sqrt(width), _sage_const_0 ], [_sage_const_0 , _sage_const_1 /sqrt(width)]])
-            sigma = sigma * scaling
-            if c not in Cdict:
-                Cdata = (QQ(c), QQ(c), matrix([[_sage_const_1 , _sage_const_0 ], [_sage_const_0 , _sage_const_1 ]]), sigma)
+            sigma = _immutable(sigma * scaling)
+            if QQ(c) not in Cdict:
+                Cdata = (QQ(c), QQ(c), _immutable(matrix([[_sage_const_1 , _sage_const_0 ], [_sage_const_0 , _sage_const_1 ]])), sigma)
                 Cdict[QQ(c)] = Cdata
             Udata = (pvertex, QQ(c), U_ell, sigma)
             Udict[pvertex] = Udata
     groupdata_dict['Udata'] = Udict
     groupdata_dict['Cdata'] = Cdict
     groupdata_dict['level'] = N
+    groupdata_dict['version'] = GROUPDATA_VERSION
     return groupdata_dict
-
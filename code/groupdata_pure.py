@@ -0,0 +1,249 @@
+"""
+Computes basic data associated to group Gamma0(N) without Sage.
+
+group_data(N) returns a dictionary with the same keys and layout as
+groupdata.group_data(N) (see groupdata.sage), built with integer and
+rational arithmetic only:
+
+    coset_reps : List of coset representatives as 2x2 tuple matrices
+                 ((a, b), (c, d)), one lift to SL2(Z) per point (c : d) of
+                 P^1(Z/N).
+    cusps      : List of cusps, infinity first, then sorted by value.
+    pvertices  : Set of parabolic vertices gamma(oo) = a/c of the coset reps.
+    level      : Integer level
+    widths     : dict cusp -> width N/d of the numerology in groupdata.sage
+    Udata      : Udict, values (pvertex, cusp, U_ell, sigma_ell)
+    Cdata      : Cdict, values (cusp, cusp, identity, sigma_ell)
+
+A cusp or vertex a/c is the reduced integer pair (a, c) with c >= 0, and
+infinity is INFINITY = (1, 0). U_ell is an integer matrix in Gamma0(N) and
+sigma_ell the normalizing map, scaled by diag(sqrt(width), 1/sqrt(width)) as
+in the Sage version; the scaled matrix is the only one with float entries.
+
+Cusps a/c and a'/c' are Gamma0(N)-equivalent iff y a' = a mod gcd(c, N) and
+c' = y c mod N for some y prime to N (Diamond-Shurman, Prop. 3.8.3). A full
+set of classes is a/d for d | N and a prime to gcd(d, N/d); for the levels
+allowed by check_level that is one cusp per divisor, 0 for d = 1, 1/d, and
+infinity for d = N, matching Gamma0(N).cusps().
+
+The coset reps and U_ell need not be the same matrices Sage picks (any lift
+and any Gamma0(N) element will do); groupdata_check.sage compares the two
+backends up to those choices.
+"""
+import math
+from fractions import Fraction
+from functools import lru_cache
+
+INFINITY = (1, 0)
+IDENTITY = ((1, 0), (0, 1))
+
+
+def check_level(N):
+    """
+    Checks that N = 2^r p_1 ... p_n, r <= 3 and p_j distinct, odd.
+    """
+    assert (N % 16) != 0, "Too many two factors"
+    while N % 2 == 0:
+        N = N // 2
+    p = 2
+    while p*p <= N:
+        assert N % (p*p) != 0, "N not squarefree"
+        p += 1
+    return True
+
+
+def xgcd(a, b):
+    """(g, s, t) with g = s*a + t*b = gcd(a, b) >= 0."""
+    s0, s1, t0, t1 = 1, 0, 0, 1
+    while b:
+        q, r = divmod(a, b)
+        a, b = b, r
+        s0, s1 = s1, s0 - q*s1
+        t0, t1 = t1, t0 - q*t1
+    if a < 0:
+        a, s0, t0 = -a, -s0, -t0
+    return a, s0, t0
+
+
+def mat_mul(A, B):
+    return ((A[0][0]*B[0][0] + A[0][1]*B[1][0], A[0][0]*B[0][1] + A[0][1]*B[1][1]),
+            (A[1][0]*B[0][0] + A[1][1]*B[1][0], A[1][0]*B[0][1] + A[1][1]*B[1][1]))
+
+
+def mat_inv(A):
+    """Inverse of a determinant one integer matrix."""
+    return ((A[1][1], -A[0][1]), (-A[1][0], A[0][0]))
+
+
+def cusp(a, c):
+    """The reduced pair for a/c (c = 0 gives INFINITY)."""
+    g = math.gcd(a, c)
+    a, c = a // g, c // g
+    if c < 0 or (c == 0 and a < 0):
+        a, c = -a, -c
+    return (a, c)
+
+
+def act(A, x):
+    """A acting on the cusp x = (a, c) by fractional linear transformation."""
+    return cusp(A[0][0]*x[0] + A[0][1]*x[1], A[1][0]*x[0] + A[1][1]*x[1])
+
+
+def to_fraction(x):
+    """Fraction a/c for a finite cusp, None for INFINITY."""
+    return None if x[1] == 0 else Fraction(x[0], x[1])
+
+
+def in_gamma0(A, N):
+    return A[1][0] % N == 0
+
+
+def units(N):
+    return [y for y in range(N) if math.gcd(y, N) == 1] if N > 1 else [0]
+
+
+def cusps_equivalent(x, y, N):
+    """Gamma0(N)-equivalence of the cusps x = (a, c), y = (a', c') (Diamond-Shurman 3.8.3)."""
+    (a, c), (a2, c2) = x, y
+    g = math.gcd(c, N)
+    return any((u*a2 - a) % g == 0 and (c2 - u*c) % N == 0 for u in units(N))
+
+
+def sl2z_lift(c, d, N):
+    """A matrix ((a, b), (c', d')) in SL2(Z) with (c', d') = (c, d) mod N and 0 <= a < c'."""
+    c, d = c % N, d % N
+    if N == 1:
+        return IDENTITY
+    if d == 0:
+        d = N
+    # gcd(c, d, N) = 1, so some c + kN is prime to d
+    k = 0
+    while math.gcd(c + k*N, d) != 1:
+        k += 1
+    c += k*N
+    g, s, t = xgcd(d, -c)
+    # T^k on the left keeps the coset; put the vertex a/c in [0, 1)
+    k = s // c if c else 0
+    return ((s - k*c, t - k*d), (c, d))
+
+
+def divisors(N):
+    return [d for d in range(1, N+1) if N % d == 0]
+
+
+@lru_cache(maxsize=None)
+def p1_list(N):
+    """
+    One pair (c, d) per point of P^1(Z/N): every point has a representative
+    with d | N, and (c, d) ~ (u c, u d) for units u = 1 mod N/d.
+    """
+    if N == 1:
+        return ((0, 1),)
+    out = []
+    for d in divisors(N):
+        stab = [u for u in units(N) if (u*d - d) % N == 0]
+        seen = set()
+        for c in range(N):
+            if math.gcd(math.gcd(c, d), N) != 1:
+                continue
+            key = min(u*c % N for u in stab)
+            if key not in seen:
+                seen.add(key)
+                out.append((key, d % N))
+    return tuple(out)
+
+
+def coset_reps(N):
+    return [sl2z_lift(c, d, N) for c, d in p1_list(N)]
+
+
+def cusp_reps(N):
+    """Gamma0(N) cusp classes a/d, d | N, infinity first, the rest sorted by value."""
+    reps = []
+    for d in divisors(N):
+        if d == N:
+            continue
+        g = math.gcd(d, N // d)
+        for a in range(max(g, 1)):
+            if math.gcd(a, g) != 1:
+                continue
+            a2 = a if d > 1 else 0
+            while d > 1 and math.gcd(a2, d) != 1:
+                a2 += g
+            reps.append(cusp(a2, d))
+    reps.sort(key=to_fraction)
+    return [INFINITY] + reps
+
+
+def reduce_cusp(x, cusps, N):
+    """The class representative in `cusps` equivalent to x."""
+    for c in cusps:
+        if cusps_equivalent(x, c, N):
+            return c
+    raise ValueError("No cusp class for {} in level {}".format(x, N))
+
+
+def reduce_to_cusp(x, target, N):
+    """
+    U in Gamma0(N) with U x = target. With alpha(oo) = x and beta(oo) = target
+    in SL2(Z), every such U is beta (+-T^k) alpha^{-1}.
+    """
+    alpha = _to_infinity(x)
+    beta = _to_infinity(target)
+    for sgn in (1, -1):
+        for k in range(max(N, 1)):
+            U = mat_mul(mat_mul(beta, ((sgn, sgn*k), (0, sgn))), mat_inv(alpha))
+            if in_gamma0(U, N):
+                return U
+    raise ValueError("{} and {} are not equivalent in level {}".format(x, target, N))
+
+
+def _to_infinity(x):
+    # a matrix in SL2(Z) taking oo to x
+    a, c = x
+    g, s, t = xgcd(a, c)
+    return ((a, -t), (c, s))
+
+
+@lru_cache(maxsize=None)
+def group_data(N):
+    """
+    Computes necessary data associated to the group Gamma0(N).
+
+    The result is memoized per level and shared; do not modify it.
+    """
+    check_level(N)
+    reps = coset_reps(N)
+    pvertices = set(act(gamma, INFINITY) for gamma in reps)
+    cusps = cusp_reps(N)
+    for c in cusps:
+        if c == (0, 1) or c == INFINITY:
+            continue
+        if c not in pvertices:
+            raise ValueError("Cusp {} is not a pvertex in level {}".format(c, N))
+
+    Udict = dict()
+    Cdict = dict()
+    widths = dict()
+    for pvertex in pvertices:
+        if pvertex == INFINITY:
+            Cdict[INFINITY] = (INFINITY, INFINITY, IDENTITY, IDENTITY)
+            Udict[INFINITY] = (INFINITY, INFINITY, IDENTITY, IDENTITY)
+            widths[INFINITY] = 1
+            continue
+        # same numerology as groupdata.sage
+        c = reduce_cusp(pvertex, cusps, N)
+        U_ell = reduce_to_cusp(pvertex, c, N)
+        numer, denom = c
+        assert N % denom == 0
+        width = N // denom
+        g, s, t = xgcd(numer * width, -denom)
+        assert g == 1
+        r = math.sqrt(width)
+        sigma = ((numer*r, t/r), (denom*r, s*width/r))
+        if c not in Cdict:
+            Cdict[c] = (c, c, IDENTITY, sigma)
+            widths[c] = width
+        Udict[pvertex] = (pvertex, c, U_ell, sigma)
+    return {'coset_reps': reps, 'cusps': cusps, 'pvertices': pvertices, 'level': N,
+            'widths': widths, 'Udata': Udict, 'Cdata': Cdict}
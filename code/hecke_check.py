@@ -0,0 +1,157 @@
+#!/usr/bin/env python3
+"""
+hecke_check.py
+Check every Hecke relation among the coefficients a_1..a_M of a level one
+form, not just |a4 - (a2^2 - 1)|.
+
+Each n >= 2 is written as n = p^k * m with p its smallest prime factor and
+p not dividing m. Then
+  - if m > 1 (n is not a prime power), multiplicativity gives
+        a_n = a_{p^k} * a_m,
+  - if m = 1 and k >= 2, the prime-power recursion gives
+        a_{p^k} = a_p * a_{p^(k-1)} - a_{p^(k-2)},
+and a_1 = 1. These relations generate all of a_mn = a_m a_n (m, n coprime),
+so checking them once per n covers the full set. The factor tables are built
+from a smallest-prime-factor sieve once per M and cached, and the checks are
+a handful of vectorized gathers.
+
+The error profile err[n-1] (0 at primes, which are unconstrained) shows
+where a solve stops being trustworthy. usable_M is the largest L such that
+every relation with n <= L holds to within the tolerance; the L-value,
+sweep and bootstrap stages should not use coefficients beyond it.
+
+Usage (run from code/):
+  python3 hecke_check.py --posts outputs/scan_postprocess --tol 1e-6
+"""
+import os
+import csv
+import math
+import argparse
+from functools import lru_cache
+
+import numpy as np
+
+import compute_L_derivative as cld
+import prime_sums
+
+FIELDS = ['R', 'Y', 'M', 'hecke_max', 'hecke_rms', 'worst_n', 'usable_M', 'file']
+
+
+@lru_cache(maxsize=8)
+def spf_table(M):
+    """Smallest prime factor of each 0 <= n <= M (spf[0] = 0, spf[1] = 1)."""
+    spf = np.zeros(M+1, dtype=np.int64)
+    for p in prime_sums.primes_upto(math.isqrt(M)):
+        block = spf[p*p::p]
+        block[block == 0] = p
+    n = np.arange(M+1)
+    spf[spf == 0] = n[spf == 0]
+    spf.flags.writeable = False
+    return spf
+
+
+@lru_cache(maxsize=8)
+def factor_tables(M):
+    """
+    (spf, pk, k, m) for 0 <= n <= M with n = pk * m, pk = spf^k the full power
+    of the smallest prime factor in n (pk = 1, k = 0 for n < 2).
+    """
+    n = np.arange(M+1)
+    spf = spf_table(M)
+    pk = np.where(n >= 2, spf, 1)
+    k = (n >= 2).astype(np.int64)
+    while True:
+        nxt = pk * spf
+        grow = (n >= 2) & (nxt <= M) & (n % np.maximum(nxt, 1) == 0)
+        if not grow.any():
+            break
+        pk[grow] = nxt[grow]
+        k[grow] += 1
+    m = np.where(n >= 1, n // pk, 0)
+    for arr in (pk, k, m):
+        arr.flags.writeable = False
+    return spf, pk, k, m
+
+
+def hecke_errors(a):
+    """
+    Per-index residuals err[n-1] of the Hecke relation for a_n (a[0] = a1):
+    a_1 - 1, a_n - a_{p^k} a_m, or the prime-power recursion; 0 at primes.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    M = a.size
+    if M == 0:
+        return np.zeros(0)
+    A = np.concatenate(([0.0], a))
+    spf, pk, k, m = factor_tables(M)
+    n = np.arange(M+1)
+    err = np.zeros(M+1)
+    err[1] = A[1] - 1.0
+    comp = (n >= 2) & (m > 1)
+    err[comp] = A[comp] - A[pk[comp]] * A[m[comp]]
+    pp = (n >= 2) & (m == 1) & (k >= 2)
+    p = spf[pp]
+    err[pp] = A[pp] - (A[p] * A[n[pp] // p] - A[n[pp] // (p*p)])
+    return err[1:]
+
+
+def checked_mask(M):
+    """True for the indices n (position n-1) that carry a relation: 1 and the non-primes."""
+    spf = spf_table(M)
+    n = np.arange(1, M+1)
+    return (n == 1) | (spf[1:] != n)
+
+
+def usable_length(err, tol):
+    """Largest L with |err[n-1]| <= tol for all n <= L."""
+    bad = np.flatnonzero(~(np.abs(err) <= tol))
+    return int(bad[0]) if bad.size else int(err.size)
+
+
+def hecke_report(a, tol=1e-6):
+    """dict with max and RMS relation error, the worst index and usable_M."""
+    err = hecke_errors(a)
+    if err.size == 0:
+        return {'hecke_max': float('nan'), 'hecke_rms': float('nan'), 'worst_n': 0, 'usable_M': 0}
+    e = np.abs(err[checked_mask(err.size)])
+    worst = int(np.argmax(np.abs(err))) + 1
+    return {'hecke_max': float(e.max()), 'hecke_rms': float(np.sqrt(np.mean(e**2))),
+            'worst_n': worst, 'usable_M': usable_length(err, tol)}
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--posts', default='outputs/scan_postprocess', help='postprocess outputs dir')
+    p.add_argument('--tol', type=float, default=1e-6, help='relation error allowed within the usable truncation')
+    p.add_argument('--out', default=None, help='CSV report (default: <posts>/hecke_check.csv)')
+    p.add_argument('--profiles', default=None, help='also save every per-index error profile to this .npz')
+    cld.add_selection_args(p)
+    args = p.parse_args()
+
+    rows = []
+    profiles = {}
+    for R, Y, path in cld.input_files(args):
+        a = cld.read_coeff_file(path)
+        if not len(a):
+            continue
+        rep = hecke_report(a, tol=args.tol)
+        rows.append(dict(rep, R=f'{R:.12f}', Y=f'{Y:.3f}', M=len(a),
+                         hecke_max=f"{rep['hecke_max']:.3e}", hecke_rms=f"{rep['hecke_rms']:.3e}",
+                         file=path))
+        if args.profiles:
+            profiles[os.path.basename(path)] = hecke_errors(a)
+        print(f"R={R:.12f} Y={Y:.3f} M={len(a)} max={rep['hecke_max']:.3e} rms={rep['hecke_rms']:.3e} "
+              f"worst n={rep['worst_n']} usable_M={rep['usable_M']}")
+    outcsv = args.out or os.path.join(args.posts, 'hecke_check.csv')
+    with open(outcsv, 'w', newline='') as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        w.writerows(rows)
+    print('Wrote', outcsv)
+    if args.profiles:
+        np.savez_compressed(args.profiles, **profiles)
+        print('Wrote', args.profiles)
+
+
+if __name__ == '__main__':
+    main()
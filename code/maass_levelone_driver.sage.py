@@ -4,18 +4,29 @@
 from sage.all_cmdline import *   # import sage library
 
 _sage_const_4 = Integer(4); _sage_const_1 = Integer(1); _sage_const_2 = Integer(2); _sage_const_3 = Integer(3); _sage_const_0 = Integer(0); _sage_const_1en4 = RealNumber('1e-4')
-from maass_levelone_computations import find_single_ev_linearized, find_evs
+from driver_events import JsonlEmitter
 import sys
 import time
 
 def main():
-    if len(sys.argv) < _sage_const_4 :
-        print("  Usage:   sage progname R radius symtype")
+    # --jsonl: emit one JSON event per line (see driver_events.py) instead of text
+    jsonl = '--jsonl' in sys.argv
+    argv = [a for a in sys.argv if a != '--jsonl']
+    if len(argv) < _sage_const_4 :
+        print("  Usage:   sage progname R radius symtype [--jsonl]")
         print("  example: sage progname 9.5 0.5 -1")
         sys.exit()
-    R = float(sys.argv[_sage_const_1 ])
-    radius = float(sys.argv[_sage_const_2 ])
-    symtype = int(sys.argv[_sage_const_3 ])
+    R = float(argv[_sage_const_1 ])
+    radius = float(argv[_sage_const_2 ])
+    symtype = int(argv[_sage_const_3 ])
+    # the solver is imported only once the arguments are valid
+    from maass_levelone_computations import find_single_ev_linearized, find_evs
+    if jsonl:
+        emit = JsonlEmitter()
+        emit('search', R=R, radius=radius, symmetry=symtype)
+        val = find_single_ev_linearized(R, radius, symtype, verbosity=_sage_const_0 , callback=emit)
+        emit.finish(val[_sage_const_0 ] if val is not None else None)
+        return
     print("Searching for an eigenvalue in B({}, {}) with symtype {}".format(R, _sage_const_2 *radius, symtype))
     val = find_single_ev_linearized(R, radius, symtype, verbosity=_sage_const_2 )
     if val != None:
@@ -32,6 +43,8 @@ def other_main():
     R1 = float(sys.argv[_sage_const_1 ])
     R2 = float(sys.argv[_sage_const_2 ])
     symtype = int(sys.argv[_sage_const_3 ])
+    # the solver is imported only once the arguments are valid
+    from maass_levelone_computations import find_single_ev_linearized, find_evs
 
     start = time.time()
     evs = find_evs(R1, R2, symmetry=symtype, verbosity=_sage_const_2 )
@@ -8,151 +8,431 @@ Run inside the Sage container from the code directory:
   sage -python postprocess_scan_results.py --logs outputs/R_scan_32_36_parallel --tol 1e-8
 
 Outputs go to: outputs/scan_postprocess/
+
+Each summary.txt line ends with the full Hecke check of the dump
+(hecke_check.py): the largest relation error hecke_max and the usable
+truncation usable_M.
+
+With --jobs N the (R, Y) sign tests run on a pool of N processes; summary.txt
+is always written in increasing R order.
+
+Each log is read once, line by line, through a LogScanner, so memory does not
+grow with the log size. With --watch the log directory is tailed while the
+scan is still running: every window whose log reports a converged eigenvalue
+is queued for coefficient extraction straight away, and summary.txt is
+rewritten as results arrive. The watcher exits once no log has grown for
+--idle seconds and no extraction is pending.
 """
+import startup_report
+startup_report.install_from_argv()
+
 import re
 import os
+import json
 import math
+import time
 import argparse
+from concurrent.futures import ProcessPoolExecutor, as_completed, wait, FIRST_COMPLETED
 
-from maass_levelone_computations import maass_form_coeffs
+import coeff_bank
+import coeff_cache
+import driver_events
+import hecke_check
+import prime_sums
+from coeff_cache import maass_form_coeffs
 
 FLOAT_RE = re.compile(r"([+-]?\d+\.\d+(?:[eE][+-]?\d+)?)")
-COEFF_ERR_RE = re.compile(r"coeff|coeffs|coeff error|coeff_error", re.I)
 COEFF_NUM_RE = re.compile(r"([0-9]+\.[0-9]+(?:[eE][+-]?\d+)?)")
 
 
+EXPLICIT_RE = re.compile(r"is an eigenvalue|is a near candidate|has passed check", re.I)
+EIGEN_RE = re.compile(r"eigen(?:value)?", re.I)
+COEFF_RE = re.compile(r"coeff", re.I)
+COEFF_FALLBACK_RE = re.compile(r"coeff.*?([0-9]+\.[0-9]+e[+-]?\d+)", re.I)
+DONE_RE = re.compile(r"is an eigenvalue\.|None found\.", re.I)
+SPAN = 200
+# results entry of an (R, Y) sign test that raised in --watch mode
+FAILED = 'failed'
+
+
+class LogScanner(object):
+    """
+    Single-pass state machine over a text driver log, fed one line at a time.
+
+    The refined eigenvalue is taken, in order of preference, from
+      - the last line that states it ("32.0184... is an eigenvalue.", or
+        lines with "is a near candidate" / "has passed check"),
+      - the first float within 200 characters after the last "eigen",
+      - the last float in the log,
+    and the coeff error is the first float within 200 characters after a
+    "coeff", else the first exponent-form float anywhere after a "coeff" on
+    the same line (the old whole-file regex had no DOTALL, so it never
+    crossed a newline either). Spans that run past the end of a line are
+    carried into the next lines, so only the current line is ever held in
+    memory; a carried span that finds its float is closed there.
+    """
+
+    def __init__(self):
+        self.explicit = None
+        self.eigen = None
+        self.last_float = None
+        self.coeff_err = None
+        self.coeff_fallback = None
+        self.finished = False
+        self._eigen_budget = 0
+        self._coeff_budget = 0
+
+    def feed(self, line):
+        line = line.rstrip('\n')
+        if EXPLICIT_RE.search(line):
+            fr = FLOAT_RE.search(line)
+            if fr:
+                self.explicit = float(fr.group(1))
+        if DONE_RE.search(line):
+            self.finished = True
+        floats = FLOAT_RE.findall(line)
+        if floats:
+            self.last_float = float(floats[-1])
+        self._feed_eigen(line)
+        if self.coeff_err is None:
+            self._feed_coeff(line)
+
+    def _feed_eigen(self, line):
+        # an "eigen" span still open from earlier lines (the newline is one char)
+        if self._eigen_budget > 1:
+            fr = FLOAT_RE.search(line[:self._eigen_budget - 1])
+            if fr:
+                self.eigen = float(fr.group(1))
+                self._eigen_budget = 0
+        self._eigen_budget = max(0, self._eigen_budget - len(line) - 1)
+        for m in EIGEN_RE.finditer(line):
+            fr = FLOAT_RE.search(line[m.end():m.end()+SPAN])
+            if fr:
+                self.eigen = float(fr.group(1))
+                self._eigen_budget = 0
+            else:
+                self._eigen_budget = SPAN - (len(line) - m.end())
+
+    def _feed_coeff(self, line):
+        if self.coeff_fallback is None:
+            fb = COEFF_FALLBACK_RE.search(line)
+            if fb:
+                self.coeff_fallback = float(fb.group(1))
+        if self._coeff_budget > 1:
+            fr = COEFF_NUM_RE.search(line[:self._coeff_budget - 1])
+            if fr:
+                self.coeff_err = float(fr.group(1))
+                return
+        self._coeff_budget = max(0, self._coeff_budget - len(line) - 1)
+        for m in COEFF_RE.finditer(line):
+            fr = COEFF_NUM_RE.search(line[m.end():m.end()+SPAN])
+            if fr:
+                self.coeff_err = float(fr.group(1))
+                return
+            self._coeff_budget = max(self._coeff_budget, SPAN - (len(line) - m.end()))
+
+    def result(self):
+        """(eigenvalue or None, coeff error or inf)."""
+        for cand in (self.explicit, self.eigen, self.last_float):
+            if cand is not None:
+                break
+        for err in (self.coeff_err, self.coeff_fallback):
+            if err is not None:
+                return cand, err
+        return cand, float('inf')
+
+
+class JsonlScanner(object):
+    """The LogScanner interface for --jsonl event logs (see driver_events.py)."""
+
+    def __init__(self):
+        self.cand = None
+        self.finished = False
+
+    def feed(self, line):
+        try:
+            ev = json.loads(line)
+        except ValueError:
+            return
+        if ev.get('event') == 'eigenvalue':
+            self.cand = (float(ev['R']), float(ev.get('coeff_err', float('inf'))))
+        if ev.get('event') in ('eigenvalue', 'none'):
+            self.finished = True
+
+    def result(self):
+        return self.cand if self.cand is not None else (None, float('inf'))
+
+
+def scan_log(path):
+    """Run a LogScanner over one log file, line by line."""
+    sc = LogScanner()
+    with open(path, 'r', errors='ignore') as f:
+        for line in f:
+            sc.feed(line)
+    return sc
+
+
 def find_candidates(logdir, tol=1e-8):
     candidates = []
     for fn in sorted(os.listdir(logdir)):
         if not fn.startswith('driver_') or not fn.endswith('.txt'):
             continue
         path = os.path.join(logdir, fn)
-        with open(path, 'r', errors='ignore') as f:
-            txt = f.read()
-        # Prefer explicit lines that state the refined eigenvalue, e.g.
-        #   "32.018406433624925 is an eigenvalue."
-        # or lines mentioning "is a near candidate" or "has passed check".
-        cand = None
-        for line in txt.splitlines():
-            if re.search(r"is an eigenvalue", line, re.I) or re.search(r"is a near candidate", line, re.I) or re.search(r"has passed check", line, re.I):
-                fr = FLOAT_RE.search(line)
-                if fr:
-                    try:
-                        cand = float(fr.group(1))
-                    except Exception:
-                        pass
-        # fallback: try to find a float that appears after the word 'eigen' anywhere
-        if cand is None:
-            eig_matches = []
-            for m in re.finditer(r"eigen(?:value)?", txt, re.I):
-                span = txt[m.end():m.end()+200]
-                fr = FLOAT_RE.search(span)
-                if fr:
-                    eig_matches.append((m.start(), float(fr.group(1)), span))
-            if eig_matches:
-                cand = eig_matches[-1][1]
-            else:
-                # ultimate fallback: last float in file
-                all_floats = FLOAT_RE.findall(txt)
-                if all_floats:
-                    try:
-                        cand = float(all_floats[-1])
-                    except Exception:
-                        cand = None
+        cand, coeff_err = scan_log(path).result()
         if cand is None:
             continue
-        # find a coefficient error near the occurrence
-        coeff_err = float('inf')
-        # search for 'coeff' then a nearby float
-        for m in re.finditer(r"coeff", txt, re.I):
-            span = txt[m.end():m.end()+200]
-            fr = COEFF_NUM_RE.search(span)
-            if fr:
-                try:
-                    coeff_err = float(fr.group(1))
-                    break
-                except Exception:
-                    pass
-        # as fallback look for patterns like 'coeff error' with +/- e
-        if coeff_err == float('inf'):
-            m2 = re.search(r"coeff.*?([0-9]+\.[0-9]+e[+-]?\d+)", txt, re.I)
-            if m2:
-                coeff_err = float(m2.group(1))
         if coeff_err <= tol:
             candidates.append((path, cand, coeff_err))
     return candidates
 
 
-def chi3(n):
-    r = n % 3
-    return 0 if r == 0 else (1 if r == 1 else -1)
+def find_candidates_jsonl(logdir, tol=1e-8):
+    """
+    Candidates from drivers run with --jsonl (driver_*.jsonl). Each log is
+    read once, line by line, and the eigenvalue event carries R and the
+    coeff error directly, so no text matching is needed.
+    """
+    candidates = []
+    for fn in sorted(os.listdir(logdir)):
+        if not fn.startswith('driver_') or not fn.endswith('.jsonl'):
+            continue
+        path = os.path.join(logdir, fn)
+        cand = driver_events.candidate_from_events(driver_events.read_events(path))
+        if cand is not None and cand[1] <= tol:
+            candidates.append((path, cand[0], cand[1]))
+    return candidates
 
 
-def sieve(n):
-    if n < 2:
-        return []
-    s = [True] * (n+1)
-    s[0] = s[1] = False
-    for p in range(2, int(n**0.5) + 1):
-        if s[p]:
-            for k in range(p*p, n+1, p):
-                s[k] = False
-    return [i for i in range(n+1) if s[i]]
+def sign_test_for_RY(R, Y, outdir):
+    os.makedirs(outdir, exist_ok=True)
+    coeffs = maass_form_coeffs(Y, R, symmetry=-1)
+    a = [1.0] + [float(c) for c in coeffs]
+    M = len(a)
+    # Hecke checks: a4 and a2
+    a2 = a[1] if len(a) > 1 else float('nan')
+    a4 = a[3] if len(a) > 3 else float('nan')
+    hecke_err = abs(a4 - (a2**2 - 1)) if (not math.isnan(a2) and not math.isnan(a4)) else float('nan')
+    Xs = (500, 1000, 2000, 5000)
+    Svals = dict(zip(Xs, prime_sums.S_f(a, Xs).tolist()))
+    # save coefficients
+    coeffile = os.path.join(outdir, f'coeffs_R_{R:.12f}_Y_{Y:.3f}.txt')
+    with open(coeffile, 'w') as f:
+        for i, ai in enumerate(a, start=1):
+            f.write(f"{i} {ai:.16e}\n")
+    hecke = hecke_check.hecke_report(a)
+    return (Y, M, hecke_err, coeffile, Svals, hecke)
 
 
 def sign_test_for_R(R, outdir, Ys=(0.02,0.01)):
-    os.makedirs(outdir, exist_ok=True)
-    results = []
-    for Y in Ys:
-        coeffs = maass_form_coeffs(Y, R, symmetry=-1)
-        a = [1.0] + [float(c) for c in coeffs]
-        M = len(a)
-        ps = sieve(M)
-        # Hecke checks: a4 and a2
-        a2 = a[1] if len(a) > 1 else float('nan')
-        a4 = a[3] if len(a) > 3 else float('nan')
-        hecke_err = abs(a4 - (a2**2 - 1)) if (not math.isnan(a2) and not math.isnan(a4)) else float('nan')
-        Svals = {}
-        for X in (500, 1000, 2000, 5000):
-            S = sum(a[p-1]*chi3(p)*math.exp(-p/X) for p in ps if chi3(p) != 0 and p <= M)
-            Svals[X] = S
-        # save coefficients
-        coeffile = os.path.join(outdir, f'coeffs_R_{R:.12f}_Y_{Y:.3f}.txt')
-        with open(coeffile, 'w') as f:
-            for i, ai in enumerate(a, start=1):
-                f.write(f"{i} {ai:.16e}\n")
-        results.append((Y, M, hecke_err, coeffile, Svals))
+    return [sign_test_for_RY(R, Y, outdir) for Y in Ys]
+
+
+def _sign_test_task(R, Y, outdir):
+    # worker entry point: one (R, Y) test plus this process's cache hits/misses
+    cache = coeff_cache.default_cache()
+    hits, misses = cache.hits, cache.misses
+    res = sign_test_for_RY(R, Y, outdir)
+    return res, cache.hits - hits, cache.misses - misses
+
+
+def run_sign_tests(cand, out, Ys=(0.02,0.01), jobs=1):
+    """
+    Sign tests for every candidate (path, R, coeff_err). With jobs > 1 each
+    (R, Y) pair is a separate task on a process pool; every task writes only
+    into its own R_* directory. Returns {R: [result for each Y, in Ys order]}.
+    """
+    results = {}
+    if jobs <= 1:
+        for path, R, coeff_err in cand:
+            print('Processing', os.path.basename(path), 'R=', R, 'coeff_err=', coeff_err)
+            results[R] = sign_test_for_R(R, os.path.join(out, f'R_{R:.12f}'), Ys=Ys)
+        return results
+    cache = coeff_cache.default_cache()
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {}
+        for path, R, coeff_err in cand:
+            outdir = os.path.join(out, f'R_{R:.12f}')
+            for k, Y in enumerate(Ys):
+                futures[pool.submit(_sign_test_task, R, Y, outdir)] = (R, k)
+            results[R] = [None] * len(Ys)
+        for fut in as_completed(futures):
+            R, k = futures[fut]
+            res, hits, misses = fut.result()
+            cache.hits += hits
+            cache.misses += misses
+            results[R][k] = res
+            print('Finished R=%.12f Y=%.3f' % (R, res[0]))
     return results
 
 
+def summary_lines_for(cand, results):
+    """Summary text for all candidates, in increasing R order."""
+    summary_lines = []
+    for path, R, coeff_err in sorted(cand, key=lambda c: c[1]):
+        for res in results[R]:
+            if res is FAILED:
+                continue
+            Y, M, hecke_err, coeffile, Svals, hecke = res
+            line = (f"R={R:.12f} Y={Y:.3f} M={M} hecke_err={hecke_err:.3e} coeff_err={coeff_err:.3e} coeffile={coeffile}"
+                    f" hecke_max={hecke['hecke_max']:.3e} usable_M={hecke['usable_M']}")
+            summary_lines.append(line)
+            for X, S in Svals.items():
+                summary_lines.append(f"  X={X}: S_f={S:+.6f}")
+    return summary_lines
+
+
+def write_summary(summary_file, cand, results):
+    """Write summary.txt for the candidates whose sign tests are all done."""
+    done = [c for c in cand if all(r is not None for r in results[c[1]])]
+    tmp = summary_file + '.tmp'
+    with open(tmp, 'w') as f:
+        f.write('\n'.join(summary_lines_for(done, results)))
+    os.replace(tmp, summary_file)
+    return len(done)
+
+
+class LogTail(object):
+    """Follow one growing log, feeding each complete line to a fresh scanner."""
+
+    def __init__(self, path, scanner_cls, chunk=1 << 20):
+        self.path = path
+        self.scanner_cls = scanner_cls
+        self.chunk = chunk
+        self.reset()
+
+    def reset(self):
+        self.offset = 0
+        self.partial = b''
+        self.scanner = self.scanner_cls()
+        self.reported = False
+
+    def poll(self):
+        """Read whatever was appended since the last call; True if anything was."""
+        try:
+            size = os.path.getsize(self.path)
+        except OSError:
+            return False
+        if size < self.offset:
+            # log was truncated (window rerun): start over
+            self.reset()
+        if size == self.offset:
+            return False
+        with open(self.path, 'rb') as f:
+            f.seek(self.offset)
+            while self.offset < size:
+                data = f.read(min(self.chunk, size - self.offset))
+                if not data:
+                    break
+                self.offset += len(data)
+                lines = (self.partial + data).split(b'\n')
+                self.partial = lines.pop()
+                for line in lines:
+                    self.scanner.feed(line.decode('utf-8', 'ignore'))
+        return True
+
+
+def watch(logdir, out, tol=1e-8, Ys=(0.02,0.01), jobs=1, jsonl=False, poll=10.0, idle=600.0):
+    """
+    Tail `logdir` and run the sign tests for each newly converged window while
+    the scan is in progress. Returns (cand, results) like the batch mode. A
+    test that raises (solver error, bad dump) is logged with its R and Y and
+    recorded as FAILED, and watching goes on.
+    """
+    ext = '.jsonl' if jsonl else '.txt'
+    scanner_cls = JsonlScanner if jsonl else LogScanner
+    summary_file = os.path.join(out, 'summary.txt')
+    cache = coeff_cache.default_cache()
+    tails = {}
+    cand = []
+    results = {}
+    futures = {}
+    last_data = time.time()
+    print('Watching', logdir, 'every %gs (exit after %gs idle)' % (poll, idle))
+    with ProcessPoolExecutor(max_workers=max(1, jobs)) as pool:
+        while True:
+            if os.path.isdir(logdir):
+                for fn in sorted(os.listdir(logdir)):
+                    if fn.startswith('driver_') and fn.endswith(ext) and fn not in tails:
+                        tails[fn] = LogTail(os.path.join(logdir, fn), scanner_cls)
+            for fn in sorted(tails):
+                tail = tails[fn]
+                if tail.poll():
+                    last_data = time.time()
+                if tail.reported or not tail.scanner.finished:
+                    continue
+                tail.reported = True
+                R, coeff_err = tail.scanner.result()
+                if R is None or coeff_err > tol or R in results:
+                    continue
+                print('Converged', fn, 'R=', R, 'coeff_err=', coeff_err)
+                cand.append((tail.path, R, coeff_err))
+                results[R] = [None] * len(Ys)
+                outdir = os.path.join(out, f'R_{R:.12f}')
+                for k, Y in enumerate(Ys):
+                    futures[pool.submit(_sign_test_task, R, Y, outdir)] = (R, k)
+
+            if futures:
+                done, _ = wait(list(futures), timeout=poll, return_when=FIRST_COMPLETED)
+            else:
+                done = []
+                if time.time() - last_data >= idle:
+                    break
+                time.sleep(poll)
+            for fut in done:
+                R, k = futures.pop(fut)
+                try:
+                    res, hits, misses = fut.result()
+                except Exception as e:
+                    print('Failed R=%.12f Y=%.3f: %r' % (R, Ys[k], e))
+                    results[R][k] = FAILED
+                    continue
+                cache.hits += hits
+                cache.misses += misses
+                results[R][k] = res
+                print('Finished R=%.12f Y=%.3f' % (R, res[0]))
+            if done:
+                n = write_summary(summary_file, cand, results)
+                print('Updated', summary_file, '(%d forms)' % n)
+    return cand, results
+
+
 def main():
     p = argparse.ArgumentParser()
     p.add_argument('--logs', default='outputs/R_scan_32_36_parallel', help='logs directory')
     p.add_argument('--tol', type=float, default=1e-8, help='coeff error threshold for accepting a candidate')
     p.add_argument('--out', default='outputs/scan_postprocess', help='output directory')
+    p.add_argument('--bank', default=None, help='coefficient bank to append the new dumps to (see coeff_bank.py)')
+    p.add_argument('--jobs', type=int, default=1, help='worker processes for the (R, Y) sign tests')
+    p.add_argument('--jsonl', action='store_true', help='read driver_*.jsonl event logs instead of text logs')
+    p.add_argument('--watch', action='store_true', help='tail a running scan and process windows as they converge')
+    p.add_argument('--poll', type=float, default=10.0, help='seconds between polls in --watch mode')
+    p.add_argument('--idle', type=float, default=600.0, help='--watch exits after this many seconds without new log data')
+    p.add_argument('--startup-report', action='store_true', help='print per-module import times at exit')
     args = p.parse_args()
+    startup_report.mark_ready()
 
-    cand = find_candidates(args.logs, tol=args.tol)
     os.makedirs(args.out, exist_ok=True)
-    summary_lines = []
+    summary_file = os.path.join(args.out, 'summary.txt')
+    if args.watch:
+        cand, results = watch(args.logs, args.out, tol=args.tol, Ys=(0.02,0.01), jobs=args.jobs,
+                              jsonl=args.jsonl, poll=args.poll, idle=args.idle)
+    else:
+        if args.jsonl:
+            cand = find_candidates_jsonl(args.logs, tol=args.tol)
+        else:
+            cand = find_candidates(args.logs, tol=args.tol)
+        if cand:
+            print('Found', len(cand), 'candidates')
+            results = run_sign_tests(cand, args.out, Ys=(0.02,0.01), jobs=args.jobs)
     if not cand:
         print('No candidates found with coeff_err <=', args.tol, 'in', args.logs)
         return
-    print('Found', len(cand), 'candidates')
-    for path, R, coeff_err in cand:
-        print('Processing', os.path.basename(path), 'R=', R, 'coeff_err=', coeff_err)
-        outdir = os.path.join(args.out, f'R_{R:.12f}')
-        res = sign_test_for_R(R, outdir, Ys=(0.02,0.01))
-        # write summary
-        for Y, M, hecke_err, coeffile, Svals in res:
-            line = f"R={R:.12f} Y={Y:.3f} M={M} hecke_err={hecke_err:.3e} coeff_err={coeff_err:.3e} coeffile={coeffile}"
-            summary_lines.append(line)
-            for X, S in Svals.items():
-                summary_lines.append(f"  X={X}: S_f={S:+.6f}")
-    summary_file = os.path.join(args.out, 'summary.txt')
-    with open(summary_file, 'w') as f:
-        f.write('\n'.join(summary_lines))
+    write_summary(summary_file, cand, results)
     print('Wrote summary to', summary_file)
+    print(coeff_cache.report())
+    if args.bank:
+        n = coeff_bank.import_text_dumps(args.out, args.bank, summary=summary_file)
+        print('Appended', n, 'forms to', args.bank)
 
 if __name__ == '__main__':
     main()
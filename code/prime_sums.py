@@ -0,0 +1,118 @@
+"""
+prime_sums.py
+The chi3-twisted prime sum used by every sign test,
+
+  S_f(X) = sum_{p <= M, p prime} a_p * chi3(p) * exp(-p/X),
+
+evaluated for a whole vector of X values (and optionally a whole stack of
+forms) in one matrix product.
+
+Primes come from a NumPy sieve that is kept for the life of the process and
+doubled in size whenever a larger bound is requested, and the per-M prime
+tables (positions, p, chi3(p)) are cached, so repeated sign tests only pay
+for the exponentials.
+
+truncation() bounds the prime sum past a cut using |a_p| <= 2 p^{7/64}
+(coeff_bounds.py), so S_f can be evaluated on the fewest coefficients that
+still meet a requested tolerance.
+"""
+from functools import lru_cache
+
+import numpy as np
+
+import coeff_bounds
+
+# default memory budget for one block of the exp(-p/X) kernel
+MAX_MEM_MB = 256
+
+_sieve = np.zeros(0, dtype=bool)
+
+
+def is_prime_table(n):
+    """Boolean table t with t[k] True iff k is prime, for 0 <= k <= n (read-only)."""
+    global _sieve
+    if _sieve.size <= n:
+        size = max(n + 1, 2*_sieve.size, 1024)
+        s = np.ones(size, dtype=bool)
+        s[:2] = False
+        s[4::2] = False
+        for p in range(3, int(size**0.5) + 1, 2):
+            if s[p]:
+                s[p*p::2*p] = False
+        s.flags.writeable = False
+        _sieve = s
+    return _sieve[:n+1]
+
+
+def primes_upto(n):
+    """All primes p <= n as an int64 array."""
+    if n < 2:
+        return np.zeros(0, dtype=np.int64)
+    return np.flatnonzero(is_prime_table(n)).astype(np.int64)
+
+
+@lru_cache(maxsize=32)
+def prime_tables(M):
+    """
+    Return (idx, p, chi) for the primes p <= M with chi3(p) != 0: 0-based
+    positions into a coefficient array a[0]=a1, p as float64 and chi3(p).
+    """
+    pint = primes_upto(M)
+    pint = pint[pint != 3]
+    idx = pint - 1
+    p = pint.astype(np.float64)
+    chi = np.where(pint % 3 == 1, 1.0, -1.0)
+    for arr in (idx, p, chi):
+        arr.flags.writeable = False
+    return idx, p, chi
+
+
+def kernel_block(nprimes, max_mem_mb=MAX_MEM_MB, itemsize=8):
+    """Number of X values whose (X x primes) kernel fits in max_mem_mb."""
+    return max(1, int(max_mem_mb * 2**20 // (itemsize * max(1, nprimes))))
+
+
+def S_f(a, Xs, block=None, max_mem_mb=MAX_MEM_MB):
+    """
+    S_f(X) for every X in `Xs`.
+
+    `a` is a coefficient array with a[0]=a1 of length M (primes up to M are
+    used), or a 2-D array with one zero-padded form per row. Returns shape
+    (len(Xs),) for 1-D `a` and (forms, len(Xs)) for 2-D `a`. The X values
+    are processed `block` at a time, by default as many as keep the
+    block x pi(M) kernel within max_mem_mb.
+    """
+    a = np.asarray(a, dtype=np.float64)
+    X = np.atleast_1d(np.asarray(Xs, dtype=np.float64))
+    idx, p, chi = prime_tables(a.shape[-1])
+    c = a[..., idx] * chi
+    out = np.empty(a.shape[:-1] + (X.size,))
+    if block is None:
+        block = kernel_block(p.size, max_mem_mb)
+    buf = np.empty((min(block, X.size), p.size))
+    for i in range(0, X.size, block):
+        x = X[i:i+block]
+        K = buf[:x.size]
+        np.multiply.outer(-1.0/x, p, out=K)
+        np.exp(K, out=K)
+        out[..., i:i+block] = c @ K.T
+    return out
+
+
+def truncation(M, Xs, tol, theta=coeff_bounds.KIM_SARNAK):
+    """
+    (M_eff, tail_bound): the smallest M_eff <= M with
+
+      sum_{p > M_eff} |a_p chi3(p) exp(-p/X)| <= tail_bound <= tol
+
+    for every X in `Xs`, under |a_p| <= 2 p^theta (past the prime table the
+    bound is summed over all integers). If M itself is not enough, M_eff = M
+    and tail_bound is the bound at M.
+    """
+    X = float(np.max(Xs))
+    T = coeff_bounds.table_length(M, theta, X)
+    idx, p, chi = prime_tables(T)
+    terms = np.zeros(T)
+    terms[idx] = 2.0 * np.exp(theta*np.log(p) - p/X)
+    tail = coeff_bounds.tail_bounds(terms, theta, X, 2.0)
+    return coeff_bounds.truncation_point(tail, M, tol)
@@ -1,27 +1,14 @@
 # run_Y_sweep_form22.py
-import math
-from maass_levelone_computations import maass_form_coeffs
+# Same sweep as manifests/Y_sweep_form22.json for run_sign_test_batch.py
+import coeff_cache
+import prime_sums
+from coeff_cache import maass_form_coeffs
 
 # Parameters
 R = 30.27904849913951
 Y_values = [0.05, 0.04, 0.03, 0.025, 0.02]
 TRUNC_M = 219  # use same number of coefficients for each Y
 
-def chi3(n):
-    r = n % 3
-    return 0 if r == 0 else (1 if r == 1 else -1)
-
-def sieve(n):
-    if n < 2:
-        return []
-    s = [True] * (n+1)
-    s[0] = s[1] = False
-    for p in range(2, int(n**0.5) + 1):
-        if s[p]:
-            for k in range(p*p, n+1, p):
-                s[k] = False
-    return [i for i in range(n+1) if s[i]]
-
 primes_to_check = [2,3,5,7,11,13,17,19,23]
 composite_checks = {
     'a4_check': (4, lambda a: a[3] - (a[1]**2 - 1)),     # a4 - (a2^2 - 1)
@@ -44,7 +31,6 @@ for Y in Y_values:
     else:
         a = a_full + [0.0] * (TRUNC_M - len(a_full))
     M = len(a)
-    ps = sieve(M)
 
     out_lines.append(f"Y={Y}: M={M}")
     # Hecke composite checks
@@ -64,8 +50,7 @@ for Y in Y_values:
             out_lines.append(f"  a_{p} = n/a")
 
     # Compute S_f(X) with truncation to primes <= M
-    for X in X_values:
-        S = sum(a[p-1]*chi3(p)*math.exp(-p/X) for p in ps if chi3(p) != 0 and p <= M)
+    for X, S in zip(X_values, prime_sums.S_f(a, X_values)):
         out_lines.append(f"  X={X:5d}: S_f={S:+.6f} {'NEG' if S<0 else 'POS'}")
 
     out_lines.append("")
@@ -77,3 +62,4 @@ with open(outpath, 'w') as f:
 
 print('Wrote', outpath)
 print('\n'.join(out_lines))
+print(coeff_cache.report())
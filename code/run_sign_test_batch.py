@@ -0,0 +1,168 @@
+#!/usr/bin/env python3
+"""
+run_sign_test_batch.py
+Run the chi3 sign test for every target listed in a manifest, in one process.
+
+A manifest is a CSV file with columns
+
+  label, R, symmetry, Y, trunc, X
+
+where Y and X are ';'-separated lists, or a JSON file holding a list of
+objects with the same keys (Y and X may then be JSON lists). symmetry
+defaults to -1, trunc (number of coefficients a_1..a_trunc to keep, zero
+padded if the solve returned fewer) defaults to no truncation and X to
+500;1000;2000;5000. See manifests/ for examples.
+
+Coefficients come from the disk cache (coeff_cache.py), so targets that were
+already solved cost a file read, and all targets share the prime tables of
+prime_sums.py. Results go to one long-format CSV with a row per
+(target, Y, X):
+
+  label,R,symmetry,Y,M,hecke_err,hecke_max,usable_M,X,S_f,M_eff,tail_bound
+
+hecke_err is the quick a4 check, hecke_max and usable_M come from the full
+relation check in hecke_check.py. M_eff is the number of coefficients summed
+for that X and tail_bound bounds the primes left out (|a_p| <= 2 p^{7/64},
+see prime_sums.truncation); with --tol the sum stops at the first M_eff
+whose tail bound is below the tolerance.
+
+Run inside the Sage container from the code directory:
+  sage -python run_sign_test_batch.py manifests/chebyshev_targets.csv --out outputs/sign_tests_batch.csv
+"""
+import startup_report
+startup_report.install_from_argv()
+
+import os
+import csv
+import json
+import argparse
+
+import numpy as np
+
+import coeff_bank
+import coeff_cache
+import hecke_check
+import prime_sums
+
+DEFAULT_X = (500, 1000, 2000, 5000)
+FIELDS = ['label', 'R', 'symmetry', 'Y', 'M', 'hecke_err', 'hecke_max', 'usable_M', 'X', 'S_f', 'M_eff', 'tail_bound']
+
+
+def _split(v, conv):
+    if v is None or v == '':
+        return []
+    if isinstance(v, (list, tuple)):
+        return [conv(x) for x in v]
+    if isinstance(v, (int, float)):
+        return [conv(v)]
+    return [conv(x) for x in str(v).split(';') if x.strip()]
+
+
+def _target(rec, k):
+    if rec.get('R') in (None, ''):
+        raise SystemExit('manifest entry %d has no R' % k)
+    Ys = _split(rec.get('Y'), float)
+    if not Ys:
+        raise SystemExit('manifest entry %d has no Y values' % k)
+    trunc = rec.get('trunc')
+    return {'label': str(rec.get('label') or k),
+            'R': float(rec['R']),
+            'symmetry': int(rec.get('symmetry') or -1),
+            'Y': Ys,
+            'trunc': int(trunc) if trunc not in (None, '') else None,
+            'X': _split(rec.get('X'), int) or list(DEFAULT_X)}
+
+
+def read_manifest(path):
+    """List of targets (dicts with label, R, symmetry, Y, trunc, X) from a CSV or JSON manifest."""
+    with open(path, 'r', newline='') as f:
+        if path.endswith('.json'):
+            recs = json.load(f)
+        else:
+            recs = list(csv.DictReader(f))
+    return [_target(rec, k) for k, rec in enumerate(recs, start=1)]
+
+
+def coefficients(R, Y, symmetry=-1, trunc=None):
+    """a_1..a_M (a_1 = 1) for the form at R, truncated or zero padded to `trunc`."""
+    coeffs = coeff_cache.maass_form_coeffs(Y, R, symmetry=symmetry)
+    a = np.concatenate(([1.0], np.asarray(coeffs, dtype=np.float64)))
+    if trunc is not None:
+        a = np.concatenate((a[:trunc], np.zeros(max(0, trunc - a.size))))
+    return a
+
+
+def write_dump(dump_dir, R, Y, a):
+    # same layout and format as postprocess_scan_results
+    outdir = os.path.join(dump_dir, f'R_{R:.12f}')
+    os.makedirs(outdir, exist_ok=True)
+    coeffile = os.path.join(outdir, f'coeffs_R_{R:.12f}_Y_{Y:.3f}.txt')
+    with open(coeffile, 'w') as f:
+        for i, ai in enumerate(a, start=1):
+            f.write(f"{i} {ai:.16e}\n")
+    return coeffile
+
+
+def cut_sums(a, Xs, tol=None):
+    """
+    (S_f(X), M_eff, tail_bound) for each X, summing only as far as tol
+    requires. Without tol every X uses all of a in one batched S_f call;
+    with tol the X values sharing an M_eff are evaluated together.
+    """
+    cuts = [prime_sums.truncation(a.size, (X,), 0.0 if tol is None else tol) for X in Xs]
+    S = np.empty(len(Xs))
+    if tol is None:
+        S[:] = prime_sums.S_f(a, Xs)
+    else:
+        groups = {}
+        for k, (M_eff, _) in enumerate(cuts):
+            groups.setdefault(M_eff, []).append(k)
+        for M_eff, ks in groups.items():
+            S[ks] = prime_sums.S_f(a[:M_eff], [Xs[k] for k in ks])
+    return [(float(s), M_eff, tail) for s, (M_eff, tail) in zip(S, cuts)]
+
+
+def run_batch(targets, dump_dir=None, tol=None):
+    """Yield one result row per (target, Y, X)."""
+    for t in targets:
+        for Y in t['Y']:
+            a = coefficients(t['R'], Y, t['symmetry'], t['trunc'])
+            hecke_err = coeff_bank.hecke_a4_error(a)
+            hecke = hecke_check.hecke_report(a)
+            sums = cut_sums(a, t['X'], tol)
+            if dump_dir:
+                write_dump(dump_dir, t['R'], Y, a)
+            print(f"{t['label']} R={t['R']:.12f} Y={Y}: M={a.size}, Hecke |a4-(a2**2-1)|={hecke_err:.2e}, "
+                  f"max={hecke['hecke_max']:.2e} usable_M={hecke['usable_M']}  "
+                  + ' '.join(f"S({X})={s:+.4f}" for X, (s, _, _) in zip(t['X'], sums)))
+            for X, (s, M_eff, tail) in zip(t['X'], sums):
+                yield {'label': t['label'], 'R': f"{t['R']:.12f}", 'symmetry': t['symmetry'],
+                       'Y': f'{Y:.3f}', 'M': a.size, 'hecke_err': f'{hecke_err:.3e}',
+                       'hecke_max': f"{hecke['hecke_max']:.3e}", 'usable_M': hecke['usable_M'],
+                       'X': X, 'S_f': f'{s:+.6f}', 'M_eff': M_eff, 'tail_bound': f'{tail:.3e}'}
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('manifest', help='CSV or JSON manifest of targets')
+    p.add_argument('--out', default='outputs/sign_tests_batch.csv', help='results CSV')
+    p.add_argument('--dump', default=None, help='also write coefficient dumps under this directory')
+    p.add_argument('--tol', type=float, default=None, help='stop each prime sum once its tail bound is below this')
+    p.add_argument('--startup-report', action='store_true', help='print per-module import times at exit')
+    args = p.parse_args()
+    startup_report.mark_ready()
+
+    targets = read_manifest(args.manifest)
+    print('Read', len(targets), 'targets from', args.manifest)
+    os.makedirs(os.path.dirname(args.out) or '.', exist_ok=True)
+    with open(args.out, 'w', newline='') as f:
+        w = csv.DictWriter(f, fieldnames=FIELDS)
+        w.writeheader()
+        for row in run_batch(targets, dump_dir=args.dump, tol=args.tol):
+            w.writerow(row)
+    print('Wrote', args.out)
+    print(coeff_cache.report())
+
+
+if __name__ == '__main__':
+    main()
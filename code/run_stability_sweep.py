@@ -4,12 +4,19 @@ Run a stability sweep over delta and smoothing values using
 `compute_L_derivative.py` internals. Writes per-coefficient-file stability CSVs
 into `outputs/scan_postprocess/stability/` as `*.stab.csv`.
 
+Each coefficient file is parsed once and the full grid is evaluated in a
+single batched call (dirichlet_series.L_grid).
+
 Usage:
   python3 run_stability_sweep.py --posts outputs/scan_postprocess
 """
+import startup_report
+startup_report.install_from_argv()
+
 import os
 import argparse
 import compute_L_derivative as cld
+import dirichlet_series as ds
 
 
 def ensure_dir(d):
@@ -17,38 +24,47 @@ def ensure_dir(d):
         os.makedirs(d, exist_ok=True)
 
 
-def run_sweep(posts_dir, deltas, smooths):
+def run_sweep(posts_dir, deltas, smooths, files=None):
+    """
+    Each coefficient file is read once; the whole (delta x smooth) grid is
+    then one batched evaluation over s in {1/2, 1/2-delta_i, 1/2+delta_i}
+    and every smoothing value, so grid size only costs arithmetic. `files`
+    (R, Y, path) tuples, e.g. from a catalog query, replace the directory walk.
+    """
     stability_dir = os.path.join(posts_dir, 'stability')
     ensure_dir(stability_dir)
 
-    # We'll accumulate per-file rows then write
-    perfile = {}
-
-    for delta in deltas:
-        for smooth in smooths:
-            print('Running delta=%g smooth=%g' % (delta, smooth))
-            rows = cld.process_posts_dir(posts_dir, delta, smooth)
-            for R, Y, M, L0, deriv, path in rows:
-                base = os.path.basename(path)
-                outname = base.replace('.txt', '.stab.csv')
-                outpath = os.path.join(stability_dir, outname)
-                if outpath not in perfile:
-                    perfile[outpath] = []
-                perfile[outpath].append((delta, smooth, R, Y, M, L0, deriv))
-
-    # write per-file CSVs
-    for outpath, entries in perfile.items():
+    s0 = 0.5
+    nd = len(deltas)
+    s_values = [s0] + [s0-d for d in deltas] + [s0+d for d in deltas]
+    print('Running %d deltas x %d smooths per file' % (nd, len(smooths)))
+
+    for R, Y, path in (cld.iter_coeff_files(posts_dir) if files is None else files):
+        a = cld.read_coeff_file(path)
+        if not len(a):
+            continue
+        M = len(a)
+        # grid[j, k]: smooth j, s_values[k]
+        grid = ds.L_grid(a, s_values, smooths)
+        base = os.path.basename(path)
+        outpath = os.path.join(stability_dir, base.replace('.txt', '.stab.csv'))
         with open(outpath, 'w') as f:
             f.write('delta,smooth,R,Y,M,L0,Lprime\n')
-            for delta, smooth, R, Y, M, L0, deriv in entries:
-                f.write('%g,%g,%.12f,%.3f,%d,%.12e,%.12e\n' % (delta, smooth, R, Y, M, L0, deriv))
+            for i, delta in enumerate(deltas):
+                for j, smooth in enumerate(smooths):
+                    L0 = grid[j, 0]
+                    deriv = (grid[j, 1+nd+i] - grid[j, 1+i]) / (2.0*delta)
+                    f.write('%g,%g,%.12f,%.3f,%d,%.12e,%.12e\n' % (delta, smooth, R, Y, M, L0, deriv))
         print('Wrote', outpath)
 
 
 def main():
     p = argparse.ArgumentParser()
     p.add_argument('--posts', default='outputs/scan_postprocess', help='postprocess outputs dir')
+    cld.add_selection_args(p)
+    p.add_argument('--startup-report', action='store_true', help='print per-module import times at exit')
     args = p.parse_args()
+    startup_report.mark_ready()
 
     # grid recommended in summary
     deltas = [0.005, 0.01, 0.02]
@@ -58,7 +74,7 @@ def main():
     if not os.path.isdir(posts_dir):
         raise SystemExit('posts dir not found: ' + posts_dir)
 
-    run_sweep(posts_dir, deltas, smooths)
+    run_sweep(posts_dir, deltas, smooths, cld.input_files(args) if args.catalog else None)
 
 
 if __name__ == '__main__':
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+"""
+scan_orchestrator.py
+Scan an interval [R1, R2] for level one Maass eigenvalues by splitting it into
+overlapping windows and running find_single_ev_linearized on each window
+across a local process pool.
+
+Window k is the ball B(R1 + k*width, radius); radius >= width/2 makes
+neighbouring windows overlap. Each window writes a driver log in the same
+format and layout as maass_levelone_driver.sage, so the result can be fed
+straight to postprocess_scan_results.py:
+
+  <out>/driver_R_{center}.txt
+
+With --jsonl the logs are JSON-lines event streams (driver_R_{center}.jsonl,
+see driver_events.py), read by postprocess_scan_results.py --jsonl.
+
+Per-window status (pending, running, done, failed) is kept in
+<out>/scan_checkpoint.json and rewritten atomically after every change. When
+a campaign is interrupted, run the same command again: finished windows are
+skipped, and windows that were running or failed are rerun (up to
+--max-attempts).
+
+Run inside the Sage container from the code directory:
+  sage -python scan_orchestrator.py --R1 32 --R2 36 --width 0.1 --radius 0.06 --jobs 4 \\
+      --out outputs/R_scan_32_36_parallel
+"""
+import os
+import sys
+import json
+import math
+import time
+import argparse
+from contextlib import redirect_stdout
+from concurrent.futures import ProcessPoolExecutor, as_completed
+
+from driver_events import JsonlEmitter
+
+CHECKPOINT_NAME = 'scan_checkpoint.json'
+
+
+def make_windows(R1, R2, width):
+    """Window centers R1, R1+width, ... up to and including R2."""
+    n = int(math.floor((R2 - R1) / width + 1e-9))
+    return [R1 + k*width for k in range(n + 1)]
+
+
+def window_label(center, width):
+    # enough decimals to keep neighbouring windows distinct, at least 2
+    digits = max(2, int(math.ceil(-math.log10(width) - 1e-9)))
+    return '%0*.*f' % (digits + 3, digits, center)
+
+
+def run_window(center, radius, symmetry, logpath, jsonl=False):
+    """
+    Worker: search B(center, radius) and write the driver log. Returns
+    (eigenvalue or None, elapsed seconds).
+    """
+    from maass_levelone_computations import find_single_ev_linearized
+    start = time.time()
+    if jsonl:
+        with open(logpath, 'w', buffering=1) as f:
+            emit = JsonlEmitter(f)
+            emit('search', R=center, radius=radius, symmetry=symmetry)
+            val = find_single_ev_linearized(center, radius, symmetry, verbosity=0, callback=emit)
+            emit.finish(val[0] if val is not None else None)
+        return (float(val[0]) if val is not None else None), time.time() - start
+    with open(logpath, 'w', buffering=1) as f, redirect_stdout(f):
+        print("Searching for an eigenvalue in B({}, {}) with symtype {}".format(center, 2*radius, symmetry))
+        val = find_single_ev_linearized(center, radius, symmetry, verbosity=2)
+        if val is not None:
+            print("{} is an eigenvalue.".format(val[0]))
+        else:
+            print("None found.")
+    return (float(val[0]) if val is not None else None), time.time() - start
+
+
+class Checkpoint(object):
+
+    def __init__(self, path, params):
+        self.path = path
+        self.params = params
+        self.windows = {}
+        if os.path.exists(path):
+            with open(path) as f:
+                state = json.load(f)
+            if state.get('params') != params:
+                raise SystemExit('checkpoint %s was written for different scan parameters %s; '
+                                 'use a new --out directory' % (path, state.get('params')))
+            self.windows = state['windows']
+
+    def save(self):
+        tmp = self.path + '.tmp'
+        with open(tmp, 'w') as f:
+            json.dump({'params': self.params, 'windows': self.windows}, f, indent=1, sort_keys=True)
+        os.replace(tmp, self.path)
+
+    def update(self, label, **fields):
+        self.windows.setdefault(label, {}).update(fields)
+        self.save()
+
+
+def run_scan(R1, R2, width, radius, symmetry, outdir, jobs=1, max_attempts=3, jsonl=False):
+    os.makedirs(outdir, exist_ok=True)
+    params = {'R1': R1, 'R2': R2, 'width': width, 'radius': radius, 'symmetry': symmetry, 'jsonl': jsonl}
+    ext = '.jsonl' if jsonl else '.txt'
+    ckpt = Checkpoint(os.path.join(outdir, CHECKPOINT_NAME), params)
+
+    todo = []
+    for center in make_windows(R1, R2, width):
+        label = window_label(center, width)
+        w = ckpt.windows.get(label)
+        if w is None:
+            ckpt.windows[label] = w = {'center': center, 'status': 'pending', 'attempts': 0,
+                                       'log': os.path.join(outdir, 'driver_R_%s%s' % (label, ext))}
+        if w['status'] == 'done':
+            continue
+        if w['attempts'] >= max_attempts:
+            print('Window %s failed %d times; skipping (last error: %s)' % (label, w['attempts'], w.get('error')))
+            continue
+        todo.append(label)
+    ckpt.save()
+    ndone = sum(1 for w in ckpt.windows.values() if w['status'] == 'done')
+    print('Scan R in [%g, %g], width %g, radius %g, symtype %d: %d windows, %d done, %d to run on %d workers'
+          % (R1, R2, width, radius, symmetry, len(ckpt.windows), ndone, len(todo), jobs))
+
+    with ProcessPoolExecutor(max_workers=jobs) as pool:
+        futures = {}
+        for label in todo:
+            w = ckpt.windows[label]
+            futures[pool.submit(run_window, w['center'], radius, symmetry, w['log'], jsonl)] = label
+            ckpt.update(label, status='running', attempts=w['attempts'] + 1, started=time.time())
+        for fut in as_completed(futures):
+            label = futures[fut]
+            try:
+                ev, elapsed = fut.result()
+            except Exception as e:
+                ckpt.update(label, status='failed', error='%s: %s' % (type(e).__name__, e))
+                print('Window %s failed: %s' % (label, e))
+                continue
+            ckpt.update(label, status='done', eigenvalue=ev, elapsed=elapsed, error=None)
+            print('Window %s done in %.1fs: %s' % (label, elapsed, ev if ev is not None else 'none found'))
+
+    failed = sorted(l for l, w in ckpt.windows.items() if w['status'] != 'done')
+    if failed:
+        print('%d windows not done: %s' % (len(failed), ' '.join(failed)))
+    print('Logs and checkpoint in', outdir)
+    return ckpt
+
+
+def main():
+    p = argparse.ArgumentParser()
+    p.add_argument('--R1', type=float, required=True)
+    p.add_argument('--R2', type=float, required=True)
+    p.add_argument('--width', type=float, default=0.1, help='spacing of window centers')
+    p.add_argument('--radius', type=float, default=None, help='search radius per window (default 0.6*width)')
+    p.add_argument('--symmetry', type=int, default=-1)
+    p.add_argument('--jobs', type=int, default=os.cpu_count() or 1)
+    p.add_argument('--max-attempts', type=int, default=3, help='give up on a window after this many failures')
+    p.add_argument('--out', default='outputs/R_scan', help='directory for driver logs and checkpoint')
+    p.add_argument('--jsonl', action='store_true', help='write JSON-lines event logs instead of text logs')
+    args = p.parse_args()
+
+    if args.R2 < args.R1 or args.width <= 0:
+        raise SystemExit('need R1 <= R2 and width > 0')
+    radius = args.radius if args.radius is not None else 0.6*args.width
+    if radius < args.width/2:
+        print('warning: radius %g < width/2; windows will not overlap' % radius, file=sys.stderr)
+    run_scan(args.R1, args.R2, args.width, radius, args.symmetry, args.out,
+             jobs=args.jobs, max_attempts=args.max_attempts, jsonl=args.jsonl)
+
+
+if __name__ == '__main__':
+    main()
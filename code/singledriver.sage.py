@@ -4,20 +4,31 @@
 from sage.all_cmdline import *   # import sage library
 
 _sage_const_5 = Integer(5); _sage_const_1 = Integer(1); _sage_const_2 = Integer(2); _sage_const_3 = Integer(3); _sage_const_4 = Integer(4); _sage_const_0 = Integer(0)
-from maass_sqfreelevel_computations import find_single_ev_linearized, find_evs, group_data
+from driver_events import JsonlEmitter
 import sys
 import time
 
 def main():
-    if len(sys.argv) < _sage_const_5 :
-        print("  Usage:   sage progname N R   radius symtype")
+    # --jsonl: emit one JSON event per line (see driver_events.py) instead of text
+    jsonl = '--jsonl' in sys.argv
+    argv = [a for a in sys.argv if a != '--jsonl']
+    if len(argv) < _sage_const_5 :
+        print("  Usage:   sage progname N R   radius symtype [--jsonl]")
         print("  example: sage progname 1 9.5 0.5 -1")
         sys.exit()
-    level = int(sys.argv[_sage_const_1 ])
-    R = float(sys.argv[_sage_const_2 ])
-    radius = float(sys.argv[_sage_const_3 ])
-    symtype = int(sys.argv[_sage_const_4 ])
+    level = int(argv[_sage_const_1 ])
+    R = float(argv[_sage_const_2 ])
+    radius = float(argv[_sage_const_3 ])
+    symtype = int(argv[_sage_const_4 ])
+    # the solver is imported only once the arguments are valid
+    from maass_sqfreelevel_computations import find_single_ev_linearized, find_evs, group_data
     gd = group_data(level)
+    if jsonl:
+        emit = JsonlEmitter()
+        emit('search', R=R, radius=radius, symmetry=symtype, level=level)
+        val = find_single_ev_linearized(R, radius, None, gd, symtype, verbosity=_sage_const_0 , allsigns=True, callback=emit)
+        emit.finish(val[_sage_const_0 ] if val is not None else None)
+        return
     print("Searching for an eigenvalue in B({}, {}) with symtype {}".format(R, _sage_const_2 *radius, symtype))
     val = find_single_ev_linearized(R, radius, None, gd, symtype, verbosity=_sage_const_2 , allsigns=True)
     if val != None:
@@ -36,6 +47,8 @@ def other_main():
     R2 = float(sys.argv[_sage_const_3 ])
     diff = float(sys.argv[_sage_const_4 ])
     symtype = int(sys.argv[_sage_const_5 ])
+    # the solver is imported only once the arguments are valid
+    from maass_sqfreelevel_computations import find_single_ev_linearized, find_evs, group_data
 
     start = time.time()
     gd = group_data(level)
@@ -0,0 +1,93 @@
+"""
+startup_report.py
+Import timing for the analysis entry points, and the deferred import of
+matplotlib.
+
+An entry point imports this module first and calls install_from_argv():
+
+  import startup_report
+  startup_report.install_from_argv()
+
+If --startup-report is on the command line, every module imported from then
+on is timed, and when the process exits a table of the slowest imports
+(cumulative and self time, in ms) is printed to stderr, together with the
+time from install to the first call of mark_ready() (or to exit). The flag
+is left in sys.argv, so the script's argparse should declare it too.
+
+Heavy dependencies are only imported where a code path needs them: the Sage
+solver on a coefficient cache miss (coeff_cache.py), mpmath in afe.py, and
+matplotlib through pyplot() when a plot is actually written.
+"""
+import sys
+import time
+import atexit
+import builtins
+
+FLAG = '--startup-report'
+
+_times = {}
+_stack = []
+_t0 = None
+_ready = None
+_orig_import = None
+
+
+def _timed_import(name, globals=None, locals=None, fromlist=(), level=0):
+    if level or name in sys.modules:
+        return _orig_import(name, globals, locals, fromlist, level)
+    t = time.perf_counter()
+    _stack.append(0.0)
+    try:
+        return _orig_import(name, globals, locals, fromlist, level)
+    finally:
+        dt = time.perf_counter() - t
+        children = _stack.pop()
+        if _stack:
+            _stack[-1] += dt
+        if name in sys.modules and name not in _times:
+            _times[name] = (dt, dt - children)
+
+
+def install():
+    """Start timing imports; the report is printed at exit."""
+    global _orig_import, _t0
+    if _orig_import is not None:
+        return
+    _t0 = time.perf_counter()
+    _orig_import = builtins.__import__
+    builtins.__import__ = _timed_import
+    atexit.register(report)
+
+
+def install_from_argv(argv=None):
+    """install() if --startup-report is in argv (default sys.argv)."""
+    if FLAG in (sys.argv if argv is None else argv):
+        install()
+
+
+def mark_ready():
+    """Record the end of startup (imports done, argument parsing finished)."""
+    global _ready
+    if _t0 is not None and _ready is None:
+        _ready = time.perf_counter() - _t0
+
+
+def report(top=25, file=None):
+    file = file or sys.stderr
+    total = (_ready if _ready is not None else time.perf_counter() - _t0) * 1e3
+    print('startup: %.1f ms to %s, %d modules imported' % (
+        total, 'ready' if _ready is not None else 'exit', len(_times)), file=file)
+    print('%10s %10s  module' % ('cum ms', 'self ms'), file=file)
+    for name, (cum, own) in sorted(_times.items(), key=lambda kv: -kv[1][0])[:top]:
+        print('%10.1f %10.1f  %s' % (cum*1e3, own*1e3, name), file=file)
+
+
+def pyplot():
+    """matplotlib.pyplot with the Agg backend, imported on first use; None if unavailable."""
+    try:
+        import matplotlib
+        matplotlib.use('Agg')
+        import matplotlib.pyplot as plt
+    except Exception:
+        return None
+    return plt
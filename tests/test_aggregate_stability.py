@@ -0,0 +1,64 @@
+"""
+Cross-checks the exact bootstrap of the median (aggregate_stability --exact)
+against a large seeded Monte Carlo bootstrap, for odd and even n.
+
+Run from the repository root:
+  python3 -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+
+import aggregate_stability as ag  # noqa: E402
+
+REPS = 200000
+SAMPLES = {
+    'odd': [3.0, 1.0, 4.0, 1.5, 9.0, 2.6, 5.3],
+    'even': [3.0, 1.0, 4.0, 1.5, 9.0, 2.6],
+    'even_ties': [0.1, 0.2, 0.2, 0.3, 0.7, 1.1, 0.3, 2.5],
+}
+
+
+def monte_carlo_medians(xs, reps=REPS, seed=1):
+    arr = np.asarray(xs)
+    rng = np.random.default_rng(seed)
+    return np.median(arr[rng.integers(0, arr.size, size=(reps, arr.size))], axis=1)
+
+
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+def test_cdf_matches_monte_carlo(name):
+    xs = SAMPLES[name]
+    meds = monte_carlo_medians(xs)
+    E = ag.ExactMedianBootstrap(xs)
+    # every attained value of the bootstrap median, including the even-n
+    # midpoints, where the cdf jumps
+    ts = np.unique(meds)
+    exact = np.array([E.cdf(t) for t in ts])
+    mc = np.searchsorted(np.sort(meds), ts, side='right') / float(REPS)
+    assert np.max(np.abs(exact - mc)) < 5e-3
+
+
+def test_cdf_keeps_attained_midpoint():
+    # 2.05 = (1.5 + 2.6)/2, where 2*t - 1.5 rounds below 2.6
+    E = ag.ExactMedianBootstrap([3, 1, 4, 1.5, 9, 2.6])
+    meds = monte_carlo_medians([3, 1, 4, 1.5, 9, 2.6])
+    assert abs(E.cdf(2.05) - np.mean(meds <= 2.05)) < 5e-3
+
+
+@pytest.mark.parametrize('name', sorted(SAMPLES))
+def test_ci_matches_bootstrap_median(name):
+    xs = SAMPLES[name]
+    E = ag.ExactMedianBootstrap(xs)
+    lo, hi = ag.exact_median_ci(xs)
+    _, mc_lo, mc_hi = ag.bootstrap_median(xs, reps=REPS, rng=ag.group_rng(1, name))
+    # the Monte Carlo percentiles interpolate between attained values, so
+    # they must lie between nearby exact quantiles
+    assert E.quantile(0.015) <= mc_lo <= E.quantile(0.035)
+    assert E.quantile(0.965) <= mc_hi <= E.quantile(0.985)
+    assert E.quantile(0.015) <= lo <= E.quantile(0.035)
+    assert E.quantile(0.965) <= hi <= E.quantile(0.985)
+    assert ag.bootstrap_median(xs, exact=True)[1:] == (lo, hi)
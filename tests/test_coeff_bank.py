@@ -0,0 +1,60 @@
+"""
+Importing text dumps into a coefficient bank must not depend on the current
+directory: a second import of the same dumps adds nothing.
+
+Run from the repository root:
+  python3 -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+
+import coeff_bank  # noqa: E402
+
+
+def write_posts(posts, forms):
+    for R, Y, a in forms:
+        d = posts / f'R_{R:.12f}'
+        d.mkdir(parents=True, exist_ok=True)
+        with open(d / f'coeffs_R_{R:.12f}_Y_{Y:.3f}.txt', 'w') as f:
+            for i, ai in enumerate(a, start=1):
+                f.write(f'{i} {ai:.16e}\n')
+
+
+def test_import_from_two_directories(tmp_path, monkeypatch):
+    rng = np.random.default_rng(0)
+    forms = [(32.018406433625, 0.02, rng.uniform(-2, 2, 60)),
+             (32.018406433625, 0.01, rng.uniform(-2, 2, 90)),
+             (33.492331282392, 0.02, rng.uniform(-2, 2, 70))]
+    posts = tmp_path / 'posts'
+    write_posts(posts, forms)
+    bank = str(tmp_path / 'bank')
+    other = tmp_path / 'elsewhere'
+    other.mkdir()
+
+    monkeypatch.chdir(tmp_path)
+    assert coeff_bank.import_text_dumps('posts', bank) == 3
+    monkeypatch.chdir(other)
+    assert coeff_bank.import_text_dumps(str(posts), bank) == 0
+    assert coeff_bank.import_text_dumps(os.path.relpath(str(posts)), bank) == 0
+
+    b = coeff_bank.CoeffBank(bank)
+    assert len(b) == 3
+    assert all(os.path.isabs(m['source']) for m in b.meta)
+    for R, Y, a in forms:
+        i = [k for k, m in enumerate(b.meta) if (m['R'], m['Y']) == (R, Y)]
+        assert len(i) == 1
+        assert np.allclose(b.row(i[0]), a)
+
+
+def test_new_dump_is_added(tmp_path):
+    posts = tmp_path / 'posts'
+    write_posts(posts, [(34.0, 0.02, np.ones(40))])
+    bank = str(tmp_path / 'bank')
+    assert coeff_bank.import_text_dumps(str(posts), bank) == 1
+    write_posts(posts, [(34.0, 0.01, np.ones(80))])
+    assert coeff_bank.import_text_dumps(str(posts), bank) == 1
+    assert len(coeff_bank.CoeffBank(bank)) == 2
@@ -0,0 +1,66 @@
+"""
+The twisted sums of dirichlet_characters are accumulated over blocks of n
+(or X) sized to a memory budget; any block size must give the result of a
+single dense pass.
+
+Run from the repository root:
+  python3 -m pytest -q tests
+"""
+import os
+import sys
+
+import numpy as np
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+
+import dirichlet_characters as dc  # noqa: E402
+
+FAM = dc.CharacterFamily.primitive(range(3, 16))
+
+
+def dense_L(a, fam, s_values, smooth):
+    a = np.asarray(a, dtype=np.float64)
+    s = np.atleast_1d(np.asarray(s_values, dtype=np.float64))
+    n = np.arange(1, a.shape[-1] + 1, dtype=np.float64)
+    w = np.exp(-np.outer(s, np.log(n)) - n/smooth)
+    return np.swapaxes((a[..., None, :] * w) @ fam.matrix(n.size).T, -1, -2)
+
+
+def dense_derivatives(a, fam, s, smooth, order):
+    a = np.asarray(a, dtype=np.float64)
+    n = np.arange(1, a.shape[-1] + 1, dtype=np.float64)
+    logn = np.log(n)
+    powers = np.power.outer(-logn, np.arange(order + 1)).T
+    c = a[..., None, :] * (powers * np.exp(-s*logn - n/smooth))
+    return np.swapaxes(c @ fam.matrix(n.size).T, -1, -2)
+
+
+@pytest.mark.parametrize('shape', [(3001,), (3, 2500)])
+@pytest.mark.parametrize('max_mem_mb', [0.05, 1, 256])
+def test_blocked_L_matches_dense(shape, max_mem_mb):
+    a = np.random.default_rng(0).uniform(-2, 2, size=shape)
+    s = (0.49, 0.5, 0.51)
+    ref = dense_L(a, FAM, s, 2000.0)
+    got = dc.L_family(a, FAM, s, 2000.0, max_mem_mb=max_mem_mb)
+    assert got.shape == ref.shape == shape[:-1] + (len(FAM), 3)
+    assert np.allclose(got, ref, rtol=1e-12, atol=1e-12)
+    ref = dense_derivatives(a, FAM, 0.5, 2000.0, 2)
+    got = dc.L_derivatives_family(a, FAM, 0.5, 2000.0, order=2, max_mem_mb=max_mem_mb)
+    assert got.shape == ref.shape
+    assert np.allclose(got, ref, rtol=1e-12, atol=1e-10)
+
+
+def test_blocked_S_f_matches_unblocked():
+    a = np.random.default_rng(1).uniform(-2, 2, size=5000)
+    X = np.geomspace(2, 5000, 300)
+    ref = dc.S_f_family(a, FAM, X, block=X.size)
+    assert np.allclose(dc.S_f_family(a, FAM, X, max_mem_mb=0.01), ref, rtol=1e-12, atol=1e-10)
+
+
+def test_real_character_mod_3_matches_chi3():
+    a = np.random.default_rng(2).uniform(-2, 2, size=1000)
+    fam = dc.CharacterFamily([(3, dc.primitive_indices(3)[0])])
+    n = np.arange(1, a.size + 1)
+    ref = np.sum(a * dc.chi3(n) * n**-0.5 * np.exp(-n/2000.0))
+    assert np.allclose(dc.L_family(a, fam, (0.5,), 2000.0, max_mem_mb=0.01)[0, 0], ref)
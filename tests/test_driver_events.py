@@ -0,0 +1,43 @@
+"""
+The final events of a --jsonl driver log carry the search window, so no
+join against the search event is needed.
+
+Run from the repository root:
+  python3 -m pytest -q tests
+"""
+import io
+import os
+import sys
+import json
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+
+import driver_events  # noqa: E402
+
+
+def events(stream):
+    return [json.loads(line) for line in stream.getvalue().splitlines()]
+
+
+def test_eigenvalue_event_has_window():
+    out = io.StringIO()
+    emit = driver_events.JsonlEmitter(out)
+    emit('search', R=32.0, radius=0.05, symmetry=-1, level=1)
+    emit('step', R=32.01, radius=0.01, remaining=0)
+    emit('check', R=32.018406433624925, passed=True, coeff_err=1.2e-10)
+    emit.finish(32.018406433624925)
+    ev = events(out)[-1]
+    assert ev['event'] == 'eigenvalue'
+    assert (ev['R'], ev['search_R'], ev['radius'], ev['level'], ev['coeff_err']) == \
+        (32.018406433624925, 32.0, 0.05, 1, 1.2e-10)
+    assert driver_events.candidate_from_events(events(out)) == (32.018406433624925, 1.2e-10)
+
+
+def test_none_event_has_window():
+    out = io.StringIO()
+    emit = driver_events.JsonlEmitter(out)
+    emit('search', R=33.5, radius=0.05, symmetry=-1)
+    emit.finish(None)
+    ev = events(out)[-1]
+    assert ev['event'] == 'none' and ev['search_R'] == 33.5 and ev['radius'] == 0.05
+    assert driver_events.candidate_from_events(events(out)) is None
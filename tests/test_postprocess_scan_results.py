@@ -0,0 +1,72 @@
+"""
+The streaming LogScanner must pick the same eigenvalue and coeff error as
+the original whole-file matching, including spans split across lines.
+
+Run from the repository root:
+  python3 -m pytest -q tests
+"""
+import os
+import re
+import sys
+
+import pytest
+
+sys.path.insert(0, os.path.join(os.path.dirname(os.path.abspath(__file__)), '..', 'code'))
+
+import postprocess_scan_results as psr  # noqa: E402
+
+
+def scan(text):
+    sc = psr.LogScanner()
+    for line in text.splitlines(True):
+        sc.feed(line)
+    return sc.result()
+
+
+def test_eigenvalue_split_across_lines():
+    # "eigenvalue" ends a line and the value is on the next, short, line; the
+    # float on the line after must not replace it
+    log = ('Refining candidate, found eigenvalue\n'
+           '32.018406433624925\n'
+           'Coeff error was 3.2e-12\n')
+    R, coeff_err = scan(log)
+    assert R == 32.018406433624925
+    assert coeff_err == 3.2e-12
+
+
+def test_later_eigen_wins():
+    log = ('eigen guess 31.9\n'
+           'eigenvalue\n'
+           '32.5\n'
+           'coeff 1.0e-10\n')
+    assert scan(log) == (32.5, 1.0e-10)
+
+
+def test_coeff_fallback_past_span():
+    # the float is more than 200 characters after "coeff" on the same line
+    log = 'eigenvalue 32.1\ncoeff error' + ' '*250 + '4.5e-11\n'
+    assert scan(log) == (32.1, 4.5e-11)
+
+
+@pytest.mark.parametrize('log', [
+    'Refining candidate, found eigenvalue\n32.018406433624925\nCoeff error was 3.2e-12\n',
+    'R = 32.0\nsearching eigen\n\n\n   33.492331282392 is here\ncoeffs: 1.5e-9\n',
+    '32.018406433624925 is an eigenvalue.\ncoeff_err 2.0e-11\n',
+    'nothing here 1.25\n',
+])
+def test_matches_whole_file_matching(log):
+    # reference: the eigen / coeff selection of the original find_candidates
+    txt = log
+    eig = [float(psr.FLOAT_RE.search(txt[m.end():m.end()+200]).group(1))
+           for m in re.finditer(r"eigen(?:value)?", txt, re.I)
+           if psr.FLOAT_RE.search(txt[m.end():m.end()+200])]
+    explicit = [float(psr.FLOAT_RE.search(l).group(1)) for l in txt.splitlines()
+                if psr.EXPLICIT_RE.search(l) and psr.FLOAT_RE.search(l)]
+    cand = explicit[-1] if explicit else (eig[-1] if eig else float(psr.FLOAT_RE.findall(txt)[-1]))
+    err = float('inf')
+    for m in re.finditer(r"coeff", txt, re.I):
+        fr = psr.COEFF_NUM_RE.search(txt[m.end():m.end()+200])
+        if fr:
+            err = float(fr.group(1))
+            break
+    assert scan(log) == (cand, err)